@@ -0,0 +1,99 @@
+import asyncio, logging
+
+class ActuationQueue:
+    """ Per-fan queue of PWM updates that only ever applies the latest value.
+
+    Submitting a value for a fan replaces any value still waiting for that fan. A single
+    worker per fan applies values one at a time, so writes to the same fan never overlap,
+    and values already applied on the fan are skipped.
+
+    Args:
+        apply: Coroutine function applying a {fan_id: pwm} map, returning {fan_id: success}.
+        applied: Function returning the PWM currently applied on a fan ID, None if unlocked.
+        allowed: Function telling whether queued values may still be applied, e.g. still in manual mode.
+        retries (int): Attempts per value before giving up on it.
+        on_done: Function called with the fan ID once its queue is empty, e.g. to push its new status.
+    """
+
+    def __init__(self, apply, applied, allowed, retries: int = 3, on_done=None):
+        self.apply = apply
+        self.applied = applied
+        self.allowed = allowed
+        self.retries = retries
+        self.on_done = on_done
+        self._desired: dict[int, int] = {}
+        self._workers: dict[int, asyncio.Task] = {}
+        self._failed: set[int] = set() # Fans whose last value was given up on
+
+    def submit(self, fan_id: int, pwm: int) -> str:
+        """ Queue a PWM value for a fan, replacing any value not applied yet.
+
+        Args:
+            fan_id (int): The ID of the fan.
+            pwm (int): The PWM value (0-255).
+
+        Returns:
+            str: "applied" if the fan already runs at this value, "pending" otherwise.
+        """
+        self._desired[fan_id] = pwm
+        self._failed.discard(fan_id)
+        if self.applied(fan_id) == pwm and fan_id not in self._workers:
+            del self._desired[fan_id]
+            return "applied"
+        if fan_id not in self._workers:
+            self._workers[fan_id] = asyncio.create_task(self._drain(fan_id))
+        return "pending"
+
+    def status(self, fan_id: int) -> str:
+        """ "pending" while a value is queued or being applied for the fan, "failed" if the last one
+        was given up on, "applied" otherwise. """
+        if fan_id in self._workers:
+            return "pending"
+        return "failed" if fan_id in self._failed else "applied"
+
+    async def _drain(self, fan_id: int):
+        """ Apply the latest desired value of a fan until nothing is left to apply. """
+        attempts = 0
+        try:
+            while fan_id in self._desired:
+                pwm = self._desired[fan_id]
+                if not self.allowed():
+                    logging.info(f"Dropping queued PWM {pwm} for fan {fan_id}, no longer in manual mode")
+                    break
+                if self.applied(fan_id) == pwm:
+                    # Nothing to do unless a newer value arrived meanwhile
+                    if self._desired.get(fan_id) == pwm:
+                        del self._desired[fan_id]
+                    continue
+
+                results = await self.apply({fan_id: pwm})
+                if results.get(fan_id):
+                    attempts = 0
+                elif self._desired.get(fan_id) == pwm:
+                    attempts += 1
+                    if attempts >= self.retries:
+                        logging.error(f"Giving up on PWM {pwm} for fan {fan_id} after {attempts} attempts")
+                        self._failed.add(fan_id)
+                        break
+                    await asyncio.sleep(0.5 * attempts)
+        finally:
+            self._desired.pop(fan_id, None)
+            self._workers.pop(fan_id, None)
+            if self.on_done is not None:
+                self.on_done(fan_id)
+
+    async def cancel(self, fan_ids=None):
+        """ Drop the queued values and wait for the writes in flight to stop, e.g. before a mode change.
+
+        Args:
+            fan_ids (Iterable | None): The fans to cancel, every fan if None.
+        """
+        fan_ids = set(self._workers if fan_ids is None else fan_ids)
+        workers = [task for fan_id, task in self._workers.items() if fan_id in fan_ids]
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        # Workers cancelled before they started never ran their cleanup
+        for fan_id in fan_ids:
+            self._workers.pop(fan_id, None)
+            self._desired.pop(fan_id, None)
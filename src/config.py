@@ -1,82 +1,100 @@
-import os
+import os, json, re
 from pathlib import Path
+from registry import HardwareRegistry
 
 # Load iLO configuration from container environment variables
-ILO_HOST = os.environ["ILO_HOST"]
-ILO_USER = os.environ["ILO_USER"]
-ILO_PASS = os.environ["ILO_PASS"]
+# ILO_HOSTS is a JSON list of {"name", "host", "user", "password"} objects to control several servers,
+# otherwise a single server is configured from ILO_HOST, ILO_USER and ILO_PASS.
+# Hosts may also set "ssh_port" and "redfish_url", e.g. to point at the simulator in tools/
+# Names go into URLs and file names, so they must be unique and only use letters, digits, "-" and "_"
+if os.environ.get("ILO_HOSTS"):
+    ILO_HOSTS = json.loads(os.environ["ILO_HOSTS"])
+else:
+    ILO_HOSTS = [{"name": "default", "host": os.environ["ILO_HOST"], "user": os.environ["ILO_USER"], "password": os.environ["ILO_PASS"]}]
+if not ILO_HOSTS:
+    raise ValueError("Invalid ILO_HOSTS: no host configured")
+for __host in ILO_HOSTS:
+    if not isinstance(__host.get("name"), str) or not re.fullmatch(r"[A-Za-z0-9_-]{1,64}", __host["name"]):
+        raise ValueError(f"Invalid ILO_HOSTS: host name {__host.get('name')!r} must be 1 to 64 letters, digits, '-' or '_'")
+if len({h["name"] for h in ILO_HOSTS}) != len(ILO_HOSTS):
+    raise ValueError("Invalid ILO_HOSTS: duplicate host name")
+ILO_HOST = ILO_HOSTS[0]["host"]
+ILO_USER = ILO_HOSTS[0]["user"]
+ILO_PASS = ILO_HOSTS[0]["password"]
+
+# Fleet configuration
+FLEET_POLL_CONCURRENCY = 16 # Maximum number of Redfish polls in flight across all hosts
 
 # CONFIGURE FOLDERS
 __current_dir = Path(__file__)
 STATIC_DIR = __current_dir.parent / "static"
 TEMPLATES_DIR = __current_dir.parent / "templates"
+DATA_DIR = Path(os.environ.get("DATA_DIR", __current_dir.parent / "data"))
 
 # Background polling configuration
 POLL_INTERVAL = 2 # seconds
+POLL_INTERVAL_FAST = 1 # seconds, while a sensor is hot or changing quickly
+POLL_INTERVAL_IDLE = 15 # seconds, while stable in auto mode and no dashboard is open
+POLL_BACKOFF_MAX = 60 # seconds, upper bound of the backoff while the iLO returns errors
+POLL_HOT_MARGIN = 10 # °C below safe-max from which a sensor is considered hot
+POLL_FAST_RATE = 0.2 # °C per second from which a sensor is considered changing quickly
+POLL_RATE_WINDOW = 10 # seconds the rate of change is measured over, a single 1°C step reads as 0.1°C/s
 
-# Fans configuration
-FANS = [
-    {"id": 0, "name": "Fan 1", "verbose-name": "Fan #1", "enabled": True},
-    {"id": 1, "name": "Fan 2", "verbose-name": "Fan #2", "enabled": True},
-    {"id": 2, "name": "Fan 3", "verbose-name": "Fan #3", "enabled": True},
-    {"id": 3, "name": "Fan 4", "verbose-name": "Fan #4", "enabled": True},
-    {"id": 4, "name": "Fan 5", "verbose-name": "Fan #5", "enabled": True},
-    {"id": 5, "name": "Fan 6", "verbose-name": "Fan #6", "enabled": True},
-]
+# Redfish HTTP client configuration
+HTTP_TIMEOUT = 5 # seconds
+HTTP_CONNECT_TIMEOUT = 10 # seconds, TLS handshakes on the iLO are slow
+HTTP_MAX_CONNECTIONS = 2
+HTTP_KEEPALIVE_EXPIRY = 60 # seconds
 
-TEMPERATURE_SENSORS = [
-    {"name": "01-Inlet Ambient", "id": 1, "verbose-name": "Inlet", "enabled": True, "safe-max": 70},
-    {"name": "02-CPU 1", "id": 2, "verbose-name": "CPU 1", "enabled": True, "safe-max": 85},
-    {"name": "03-CPU 2", "id": 3, "verbose-name": "CPU 2", "enabled": True, "safe-max": 85},
-    {"name": "04-P1 DIMM 1-3", "id": 4, "verbose-name": "P1 DIMM 1–3", "enabled": True, "safe-max": 85},
-    {"name": "05-P1 DIMM 4-6", "id": 5, "verbose-name": "P1 DIMM 4–6", "enabled": True, "safe-max": 85},
-    {"name": "06-P1 DIMM 7-9", "id": 6, "verbose-name": "P1 DIMM 7–9", "enabled": True, "safe-max": 85},
-    {"name": "07-P1 DIMM 10-12", "id": 7, "verbose-name": "P1 DIMM 10–12", "enabled": True, "safe-max": 85},
-    {"name": "08-P2 DIMM 1-3", "id": 8, "verbose-name": "P2 DIMM 1–3", "enabled": True, "safe-max": 85},
-    {"name": "09-P2 DIMM 4-6", "id": 9, "verbose-name": "P2 DIMM 4–6", "enabled": True, "safe-max": 85},
-    {"name": "10-P2 DIMM 7-9", "id": 10, "verbose-name": "P2 DIMM 7–9", "enabled": True, "safe-max": 85},
-    {"name": "11-P2 DIMM 10-12", "id": 11, "verbose-name": "P2 DIMM 10–12", "enabled": True, "safe-max": 85},
-    {"name": "12-HD Max", "id": 12, "verbose-name": "Hard Drive Max", "enabled": False, "safe-max": 80},
-    {"name": "13-Chipset", "id": 13, "verbose-name": "Chipset", "enabled": False, "safe-max": 85},
-    {"name": "14-P/S 1", "id": 14, "verbose-name": "Power Supply 1", "enabled": False, "safe-max": 80},
-    {"name": "15-P/S 2", "id": 15, "verbose-name": "Power Supply 2", "enabled": False, "safe-max": 80},
-    {"name": "16-P/S 2 Zone", "id": 16, "verbose-name": "PSU 2 Zone", "enabled": True, "safe-max": 75},
-    {"name": "17-VR P1", "id": 17, "verbose-name": "VR P1", "enabled": False, "safe-max": 90},
-    {"name": "18-VR P2", "id": 18, "verbose-name": "VR P2", "enabled": False, "safe-max": 90},
-    {"name": "19-VR P1 Mem", "id": 19, "verbose-name": "VR P1 Memory", "enabled": False, "safe-max": 90},
-    {"name": "20-VR P1 Mem", "id": 20, "verbose-name": "VR P1 Memory", "enabled": False, "safe-max": 90},
-    {"name": "21-VR P2 Mem", "id": 21, "verbose-name": "VR P2 Memory", "enabled": False, "safe-max": 90},
-    {"name": "22-VR P2 Mem", "id": 22, "verbose-name": "VR P2 Memory", "enabled": False, "safe-max": 90},
-    {"name": "23-VR P1Vtt Zone", "id": 23, "verbose-name": "VR P1 Vtt Zone", "enabled": False, "safe-max": 90},
-    {"name": "24-VR P2Vtt Zone", "id": 24, "verbose-name": "VR P2 Vtt Zone", "enabled": False, "safe-max": 90},
-    {"name": "25-HD Controller", "id": 25, "verbose-name": "HD Controller", "enabled": True, "safe-max": 80},
-    {"name": "26-iLO Zone", "id": 26, "verbose-name": "iLO Zone", "enabled": False, "safe-max": 90},
-    {"name": "27-LOM Card", "id": 27, "verbose-name": "LOM Card", "enabled": False, "safe-max": 90},
-    {"name": "28-PCI 1", "id": 28, "verbose-name": "PCI 1", "enabled": False, "safe-max": 85},
-    {"name": "29-PCI 2", "id": 29, "verbose-name": "PCI 2", "enabled": False, "safe-max": 85},
-    {"name": "30-PCI 3", "id": 30, "verbose-name": "PCI 3", "enabled": False, "safe-max": 85},
-    {"name": "31-PCI 4", "id": 31, "verbose-name": "PCI 4", "enabled": False, "safe-max": 85},
-    {"name": "32-PCI 5", "id": 32, "verbose-name": "PCI 5", "enabled": False, "safe-max": 85},
-    {"name": "33-PCI 6", "id": 33, "verbose-name": "PCI 6", "enabled": False, "safe-max": 85},
-    {"name": "34-PCI 1 Zone", "id": 34, "verbose-name": "PCI 1 Zone", "enabled": True, "safe-max": 85},
-    {"name": "35-PCI 2 Zone", "id": 35, "verbose-name": "PCI 2 Zone", "enabled": True, "safe-max": 85},
-    {"name": "36-PCI 3 Zone", "id": 36, "verbose-name": "PCI 3 Zone", "enabled": True, "safe-max": 85},
-    {"name": "37-PCI 4 Zone", "id": 37, "verbose-name": "PCI 4 Zone", "enabled": False, "safe-max": 85},
-    {"name": "38-PCI 5 Zone", "id": 38, "verbose-name": "PCI 5 Zone", "enabled": False, "safe-max": 85},
-    {"name": "39-PCI 6 Zone", "id": 39, "verbose-name": "PCI 6 Zone", "enabled": False, "safe-max": 85},
-    {"name": "40-I/O Board 1", "id": 40, "verbose-name": "I/O Board 1", "enabled": False, "safe-max": 85},
-    {"name": "41-I/O Board 2", "id": 41, "verbose-name": "I/O Board 2", "enabled": False, "safe-max": 85},
-    {"name": "42-VR P1 Zone", "id": 42, "verbose-name": "VR P1 Zone", "enabled": False, "safe-max": 90},
-    {"name": "43-BIOS Zone", "id": 43, "verbose-name": "BIOS Zone", "enabled": False, "safe-max": 85},
-    {"name": "44-System Board", "id": 44, "verbose-name": "System Board", "enabled": False, "safe-max": 70},
-    {"name": "45-SuperCap Max", "id": 45, "verbose-name": "SuperCap Max", "enabled": False, "safe-max": 85},
-    {"name": "46-Chipset Zone", "id": 46, "verbose-name": "Chipset Zone", "enabled": False, "safe-max": 85},
-    {"name": "47-Battery Zone", "id": 47, "verbose-name": "Battery Zone", "enabled": False, "safe-max": 85},
-    {"name": "48-I/O Zone", "id": 48, "verbose-name": "I/O Zone", "enabled": False, "safe-max": 85},
-    {"name": "49-Sys Exhaust", "id": 49, "verbose-name": "System Exhaust", "enabled": True, "safe-max": 70},
-    {"name": "50-Sys Exhaust", "id": 50, "verbose-name": "System Exhaust", "enabled": False, "safe-max": 70}
+# History configuration, (name, bucket in seconds, number of samples kept) from finest to coarsest
+HISTORY_DIR = DATA_DIR / "history"
+HISTORY_TIERS = [
+    ("raw", 0, 43200),      # every poll, ~1 day at the default poll interval
+    ("1m", 60, 43200),      # 1 minute averages, 30 days
+    ("1h", 3600, 17520),    # 1 hour averages, 2 years
 ]
+HISTORY_MAX_POINTS = 2000 # Points returned per query at most, a coarser tier or fewer records are used past it
+
+# Trace of every Redfish snapshot, fan command and mode change, replayed offline by tools/replay.py
+TRACE_ENABLED = os.environ.get("TRACE_ENABLED", "true").lower() in ("1", "true", "yes")
+TRACE_DIR = DATA_DIR / "traces"
+TRACE_RETENTION_DAYS = 90 # days of daily trace files kept, about 1-2 MB each at the default poll interval
+TRACE_FLUSH_INTERVAL = 30 # seconds between flushes of the compressed stream to disk
+
+# Control state kept across restarts (mode, manual speeds, applied PWMs), one file per host
+CONTROL_STATE_DIR = DATA_DIR / "control"
+RECONCILE_TOLERANCE = 3 # % between a fan reading and its locked PWM under which the fan is considered applied
+
+# SSH connection pool configuration
+SSH_POOL_SIZE = 2 # Maximum number of persistent SSH connections to the iLO
+SSH_MAX_CHANNELS = 1 # Maximum number of concurrent channels per connection
+SSH_KEEPALIVE_INTERVAL = 15 # seconds
+SSH_RECONNECT_BACKOFF_MIN = 0.5 # seconds
+SSH_RECONNECT_BACKOFF_MAX = 30 # seconds
+
+# Fans, temperature sensors and aggregation groups, compiled from HARDWARE_FILE into a registry
+# and reloaded when the file changes or on SIGHUP, read it through HARDWARE.current
+HARDWARE_FILE = Path(os.environ.get("HARDWARE_FILE", __current_dir.parent / "hardware.json"))
+HARDWARE_RELOAD_INTERVAL = 5 # seconds between checks of the file modification time
+HARDWARE = HardwareRegistry(HARDWARE_FILE)
+
+# Thermal watchdog configuration, checked on every poll in manual, silent and curve modes
+WATCHDOG_RISE_HORIZON = 10 # seconds, a sensor whose rate of rise would reach its safe-max within it is flagged
+WATCHDOG_RISE_DEBOUNCE = 2 # consecutive polls a projected breach must persist before forcing auto mode
 
 # Fan modes configuration
 SILENT_MODE_SPEED = 13 # In a range of 0-255 (0-100% speed)
-MANUAL_DEFAULT_SPEED = 18 # In a range of 0-255 (0-100% speed)
\ No newline at end of file
+MANUAL_DEFAULT_SPEED = 18 # In a range of 0-255 (0-100% speed)
+
+# Curve mode configuration, temperature (°C) -> PWM (0-255) points per sensor
+CURVE_MODE_CURVES = {
+    "01-Inlet Ambient": [(20, 13), (30, 40), (40, 120), (45, 255)],
+    "02-CPU 1": [(40, 13), (55, 30), (70, 100), (80, 255)],
+    "03-CPU 2": [(40, 13), (55, 30), (70, 100), (80, 255)],
+    "25-HD Controller": [(50, 13), (65, 60), (75, 255)],
+}
+CURVE_MODE_FAN_SENSORS = {fan.id: list(CURVE_MODE_CURVES) for fan in HARDWARE.current.fans} # Sensors driving each fan, the fan follows the highest curve
+CURVE_MODE_HYSTERESIS = 2 # °C drop ignored before slowing fans down
+CURVE_MODE_MAX_STEP_UP = 64 # Maximum PWM increase per poll
+CURVE_MODE_MAX_STEP_DOWN = 8 # Maximum PWM decrease per poll
+CURVE_MODE_DEADBAND = 4 # Minimum PWM change worth an SSH command
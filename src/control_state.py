@@ -0,0 +1,48 @@
+import json, logging, os
+from pathlib import Path
+
+class ControlStateFile:
+    """ Small JSON file keeping the control state of a host across restarts.
+
+    Writes are atomic (temporary file then rename) and skipped when nothing changed
+    since the last save, so it is cheap to save after every state change.
+
+    Args:
+        path (Path): Location of the file, created on the first save.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._saved: dict | None = None
+
+    def load(self) -> dict:
+        """ Read the saved state.
+
+        Returns:
+            dict: The saved state, empty if there is none or it cannot be read.
+        """
+        try:
+            self._saved = json.loads(self.path.read_text())
+            return dict(self._saved)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable control state {self.path}: {e}")
+            return {}
+
+    def save(self, state: dict):
+        """ Write the state if it differs from the last saved one.
+
+        Args:
+            state (dict): JSON serializable control state.
+        """
+        if state == self._saved:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(state))
+            os.replace(tmp, self.path)
+            self._saved = state
+        except OSError as e:
+            logging.error(f"Failed to save control state {self.path}: {e}")
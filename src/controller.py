@@ -0,0 +1,96 @@
+import bisect
+from typing import Mapping
+
+class FanCurve:
+    """ Piecewise linear temperature to PWM curve.
+
+    Args:
+        points (list): (temperature °C, PWM 0-255) points, sorted by temperature.
+            Below the first point the first PWM is used, above the last point the last PWM.
+    """
+
+    def __init__(self, points: list):
+        self.temps = [float(t) for t, _ in points]
+        self.pwms = [float(p) for _, p in points]
+
+    def pwm_for(self, temp: float) -> float:
+        i = bisect.bisect_right(self.temps, temp)
+        if i == 0:
+            return self.pwms[0]
+        if i == len(self.temps):
+            return self.pwms[-1]
+        t0, t1 = self.temps[i - 1], self.temps[i]
+        p0, p1 = self.pwms[i - 1], self.pwms[i]
+        return p0 + (p1 - p0) * (temp - t0) / (t1 - t0)
+
+class CurveController:
+    """ Closed-loop fan controller following temperature curves.
+
+    Each fan runs at the highest PWM asked by the curves of the sensors driving it.
+    Sensor temperatures only go down once they dropped by more than the hysteresis,
+    the PWM changes by at most max_step_up / max_step_down per evaluation, and a fan
+    is only actuated when its target moved by more than the deadband.
+
+    Args:
+        curves (dict): Map of sensor name to list of (temperature, PWM) points.
+        fan_sensors (dict): Map of fan ID to the sensor names driving it.
+        hysteresis (float): Temperature drop (°C) ignored before lowering a sensor reading.
+        max_step_up (int): Maximum PWM increase per evaluation.
+        max_step_down (int): Maximum PWM decrease per evaluation.
+        deadband (int): Minimum PWM change worth an SSH command.
+    """
+
+    def __init__(self, curves: dict, fan_sensors: dict, hysteresis: float = 2, max_step_up: int = 64,
+                 max_step_down: int = 8, deadband: int = 4):
+        self.curves = {name: FanCurve(points) for name, points in curves.items()}
+        self.fan_sensors = {fan_id: [s for s in sensors if s in self.curves] for fan_id, sensors in fan_sensors.items()}
+        self.hysteresis = hysteresis
+        self.max_step_up = max_step_up
+        self.max_step_down = max_step_down
+        self.deadband = deadband
+        self.reset()
+
+    def reset(self):
+        """ Forget the filtered temperatures and outputs, e.g. when entering curve mode. """
+        self._temps: dict[str, float] = {}
+        self._outputs: dict[int, float] = {}
+
+    def _filtered(self, temperatures: Mapping) -> dict:
+        """ Apply the hysteresis to the readings of the curve sensors. """
+        for name in self.curves:
+            value = temperatures.get(name)
+            if value is None:
+                continue
+            last = self._temps.get(name)
+            if last is None or value > last or value < last - self.hysteresis:
+                self._temps[name] = float(value)
+        return self._temps
+
+    def evaluate(self, temperatures: Mapping, applied: Mapping) -> dict:
+        """ Compute the fans that need a new PWM.
+
+        Args:
+            temperatures (Mapping): Map of sensor name to current reading.
+            applied (Mapping): Map of fan ID to the PWM currently locked on it, None or missing if unlocked.
+
+        Returns:
+            dict: Map of fan ID to the PWM to apply, only for fans whose target moved past the deadband.
+        """
+        temps = self._filtered(temperatures)
+        targets = {}
+        for fan_id, sensors in self.fan_sensors.items():
+            wanted = [self.curves[s].pwm_for(temps[s]) for s in sensors if s in temps]
+            if not wanted:
+                continue
+            goal = max(wanted)
+
+            # Rate limit from the last output, starting from the goal itself on the first evaluation
+            last = self._outputs.get(fan_id, goal)
+            output = min(max(goal, last - self.max_step_down), last + self.max_step_up)
+            self._outputs[fan_id] = output
+
+            pwm = max(0, min(255, round(output)))
+            current = applied.get(fan_id)
+            if current is None or abs(pwm - current) > self.deadband or (pwm != current and pwm in (0, 255)):
+                targets[fan_id] = pwm
+        return targets
@@ -0,0 +1,88 @@
+import asyncio
+
+class Broadcaster:
+    """ Fan-out of server-sent events to every connected dashboard.
+
+    Each subscriber only keeps the latest payload per event name, so a slow client
+    never builds up a backlog: it simply receives the most recent state when it catches up.
+    """
+
+    def __init__(self):
+        self._subscribers: set["_Subscriber"] = set()
+        self.latest: dict[str, str] = {}
+
+    @property
+    def clients(self) -> int:
+        """ Number of currently connected subscribers. """
+        return len(self._subscribers)
+
+    def publish(self, event: str, data: str):
+        """ Publish an event to every subscriber, skipping it if the payload did not change.
+
+        Args:
+            event (str): The event name, e.g. "temps".
+            data (str): The event payload.
+        """
+        if self.latest.get(event) == data:
+            return
+        self.latest[event] = data
+        for subscriber in self._subscribers:
+            subscriber.push(event, data)
+
+    async def subscribe(self, keepalive: float = 15):
+        """ Iterate over the events published while the caller is connected.
+
+        The latest payload of every event is replayed first, so a new client gets the full state.
+
+        Args:
+            keepalive (float): Seconds of inactivity after which None is yielded, so the caller
+                can send a keepalive and notice disconnected clients.
+
+        Yields:
+            tuple | None: (event, data) pairs, or None on keepalive.
+        """
+        subscriber = _Subscriber()
+        for event, data in self.latest.items():
+            subscriber.push(event, data)
+        self._subscribers.add(subscriber)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                for item in subscriber.drain():
+                    yield item
+        finally:
+            self._subscribers.discard(subscriber)
+
+class _Subscriber:
+    """ Pending events of a single client, coalesced by event name. """
+
+    def __init__(self):
+        self.pending: dict[str, str] = {}
+        self.ready = asyncio.Event()
+
+    def push(self, event: str, data: str):
+        self.pending[event] = data
+        self.ready.set()
+
+    def drain(self) -> list:
+        items = list(self.pending.items())
+        self.pending.clear()
+        self.ready.clear()
+        return items
+
+def format_sse(event: str, data: str) -> str:
+    """ Format a payload as a server-sent event.
+
+    Args:
+        event (str): The event name.
+        data (str): The payload, may span multiple lines.
+
+    Returns:
+        str: The encoded event, terminated by a blank line.
+    """
+    lines = "".join(f"data: {line}\n" for line in data.splitlines() or [""])
+    return f"event: {event}\n{lines}\n"
@@ -0,0 +1,282 @@
+import json, logging, math, mmap, struct, threading
+from array import array
+from pathlib import Path
+
+_HEADER = struct.Struct("<4sIIQQ") # magic, columns, capacity, count, head
+_MAGIC = b"ILOC" # Column-major layout, files of the former row-major layout ("ILOH") are moved aside
+
+class RingFile:
+    """ Fixed-size ring buffer of records, memory-mapped from a file and stored column by column.
+
+    The file holds a block of float64 UNIX timestamps followed by one block of float32
+    values per column (NaN when there was no reading), each `capacity` entries long, so
+    reading a column never touches the others. Once full, the oldest record is overwritten.
+
+    Records are appended from the event loop while queries run in the thread pool, so each
+    query reads the head and count once and works on that window, see _window(), and reads
+    again if appends overwrote part of it meanwhile.
+
+    Args:
+        path (Path): The file backing the ring.
+        columns (list): The column names, stored next to the file.
+        capacity (int): Maximum number of records kept.
+    """
+
+    def __init__(self, path: Path, columns: list, capacity: int):
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.capacity = capacity
+        self._index = {name: i for i, name in enumerate(self.columns)}
+        self._timestamps = _HEADER.size # Offset of the timestamp block
+        self._blocks = [self._timestamps + 8 * capacity + 4 * capacity * i for i in range(len(self.columns))]
+        self._open()
+
+    def _open(self):
+        """ Map the ring file, recreating it if its layout no longer matches the configuration. """
+        columns_path = self.path.with_suffix(".columns.json")
+        size = _HEADER.size + self.capacity * (8 + 4 * len(self.columns))
+
+        if self.path.exists():
+            try:
+                stored_columns = json.loads(columns_path.read_text())
+                with open(self.path, "rb") as f:
+                    magic = f.read(len(_MAGIC))
+            except (OSError, ValueError):
+                stored_columns, magic = None, None
+            if stored_columns != self.columns or magic != _MAGIC or self.path.stat().st_size != size:
+                logging.warning(f"History file {self.path} has a different layout, moving it aside")
+                self.path.replace(self.path.with_suffix(".old"))
+
+        if not self.path.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "wb") as f:
+                f.truncate(size)
+                f.seek(0)
+                f.write(_HEADER.pack(_MAGIC, len(self.columns), self.capacity, 0, 0))
+            columns_path.write_text(json.dumps(self.columns))
+
+        self._file = open(self.path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), size)
+        magic, _, _, count, head = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} is not a history file")
+        self._cursor = (head, count, 0) # head, count, appends since opened
+
+    @property
+    def count(self) -> int:
+        return self._cursor[1]
+
+    def append(self, timestamp: float, values: dict):
+        """ Append a record, overwriting the oldest one if the ring is full.
+
+        Args:
+            timestamp (float): UNIX timestamp of the record.
+            values (dict): Map of column name to value, missing columns are stored as NaN.
+        """
+        head, count, written = self._cursor
+        struct.pack_into("<d", self._mm, self._timestamps + 8 * head, timestamp)
+        row = [math.nan] * len(self.columns)
+        for name, value in values.items():
+            i = self._index.get(name)
+            if i is not None and value is not None:
+                row[i] = value
+        for block, value in zip(self._blocks, row):
+            struct.pack_into("<f", self._mm, block + 4 * head, value)
+
+        head, count = (head + 1) % self.capacity, min(count + 1, self.capacity)
+        _HEADER.pack_into(self._mm, 0, _MAGIC, len(self.columns), self.capacity, count, head)
+        # A single assignment, so a query never sees the head of one append with the count of another
+        self._cursor = (head, count, written + 1)
+
+    def _window(self) -> tuple:
+        """ Oldest slot, number of records a query may read and appends so far.
+
+        Once full, the oldest record is left out: its slot is the next one overwritten,
+        possibly while the query is reading it.
+        """
+        head, count, written = self._cursor
+        count = min(count, self.capacity - 1)
+        return (head - count) % self.capacity, count, written
+
+    def _intact(self, window: tuple) -> bool:
+        """ Whether the appends since the window was read only used slots outside of it. """
+        return self._cursor[2] - window[2] <= self.capacity - window[1]
+
+    def _timestamp(self, window: tuple, i: int) -> float:
+        return struct.unpack_from("<d", self._mm, self._timestamps + 8 * ((window[0] + i) % self.capacity))[0]
+
+    def _bisect(self, window: tuple, timestamp: float, right: bool = False) -> int:
+        """ Index of the first record at or after the given timestamp, or after it if `right`. """
+        lo, hi = 0, window[1]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            t = self._timestamp(window, mid)
+            if t < timestamp or (right and t == timestamp):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    @property
+    def first_timestamp(self) -> float | None:
+        window = self._window()
+        return self._timestamp(window, 0) if window[1] else None
+
+    def range(self, start: float, end: float, window: tuple | None = None) -> tuple:
+        """ First and past-the-last indexes of the records between two timestamps (inclusive).
+
+        Args:
+            start (float): First UNIX timestamp (inclusive).
+            end (float): Last UNIX timestamp (inclusive).
+            window (tuple | None): Window returned by _window(), read anew if None.
+
+        Returns:
+            tuple: The two indexes, relative to the oldest record of the window.
+        """
+        window = window or self._window()
+        return self._bisect(window, start), self._bisect(window, end, right=True)
+
+    def _read(self, block: int, typecode: str, window: tuple, lo: int, hi: int) -> array:
+        """ Decode records lo to hi of a block straight from the mapping, in at most two slices. """
+        values = array(typecode)
+        size = values.itemsize
+        first = (window[0] + lo) % self.capacity
+        length = hi - lo
+        view = memoryview(self._mm)
+        try:
+            tail = min(length, self.capacity - first)
+            values.frombytes(view[block + size * first:block + size * (first + tail)])
+            if tail < length:
+                values.frombytes(view[block:block + size * (length - tail)])
+        finally:
+            view.release()
+        return values
+
+    def query(self, columns: list, start: float, end: float, max_points: int | None = None) -> tuple:
+        """ Read the records between two timestamps, only decoding the requested columns.
+
+        Args:
+            columns (list): Column names to read. Unknown columns are ignored.
+            start (float): First UNIX timestamp (inclusive).
+            end (float): Last UNIX timestamp (inclusive).
+            max_points (int | None): Maximum number of records returned, evenly picked over the range.
+
+        Returns:
+            tuple: An array of timestamps and a dict of column name to array of values.
+        """
+        while True:
+            window = self._window()
+            lo, hi = self.range(start, end, window)
+            hi = max(lo, hi)
+            step = math.ceil((hi - lo) / max_points) if max_points and hi - lo > max_points else 1
+
+            timestamps = self._read(self._timestamps, "d", window, lo, hi)[::step]
+            series = {c: self._read(self._blocks[self._index[c]], "f", window, lo, hi)[::step]
+                      for c in columns if c in self._index}
+            if self._intact(window):
+                return timestamps, series
+
+    def close(self):
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
+
+class HistoryStore:
+    """ Time-series history of temperatures and fan speeds with automatic downsampling.
+
+    Every sample goes to the raw tier, and is averaged into each coarser tier
+    (e.g. 1 minute, 1 hour) once its bucket is complete. Each tier is a RingFile,
+    so the on-disk size is fixed and queries never load a whole tier in memory.
+
+    Args:
+        directory (Path): Directory of the tier files.
+        columns (list): Names of the recorded sensors and fans.
+        tiers (list): (name, bucket seconds, capacity) tuples, finest first. The first
+            tier must have a bucket of 0 seconds, meaning raw samples.
+    """
+
+    def __init__(self, directory: Path, columns: list, tiers: list):
+        self.tiers = [(name, bucket, RingFile(Path(directory) / f"{name}.ring", columns, capacity))
+                      for name, bucket, capacity in tiers]
+        self._buckets = {name: None for name, bucket, _ in self.tiers if bucket}
+        # Queries run in the thread pool, close() waits for them to finish before unmapping the files
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def append(self, timestamp: float, values: dict):
+        """ Record a sample and feed the downsampled tiers.
+
+        Args:
+            timestamp (float): UNIX timestamp of the sample.
+            values (dict): Map of sensor or fan name to reading.
+        """
+        for name, bucket, ring in self.tiers:
+            if not bucket:
+                ring.append(timestamp, values)
+                continue
+
+            # Accumulate the sample in the current bucket, flushing its average once it is complete
+            start = timestamp - timestamp % bucket
+            current = self._buckets[name]
+            if current and current["start"] != start:
+                ring.append(current["start"], {k: s / current["counts"][k] for k, s in current["sums"].items()})
+                current = None
+            if current is None:
+                current = self._buckets[name] = {"start": start, "sums": {}, "counts": {}}
+            for k, v in values.items():
+                if v is not None:
+                    current["sums"][k] = current["sums"].get(k, 0) + v
+                    current["counts"][k] = current["counts"].get(k, 0) + 1
+
+    def query(self, columns: list, start: float, end: float, resolution: str | None = None,
+              max_points: int | None = None) -> dict:
+        """ Query the history of one or more sensors.
+
+        Args:
+            columns (list): Sensor or fan names.
+            start (float): First UNIX timestamp (inclusive).
+            end (float): Last UNIX timestamp (inclusive).
+            resolution (str | None): Tier name, or None to use the finest tier still covering `start`
+                with at most `max_points` records in the range.
+            max_points (int | None): Maximum number of points returned, the records are thinned out past it.
+
+        Returns:
+            dict: The resolution used, the timestamps and a list of values per column (None when missing).
+                Empty once the store is closed.
+
+        Raises:
+            KeyError: If the resolution does not exist.
+        """
+        with self._lock:
+            if self._closed:
+                return {"resolution": resolution, "timestamps": [], "series": {c: [] for c in columns}}
+            return self._query(columns, start, end, resolution, max_points)
+
+    def _query(self, columns: list, start: float, end: float, resolution: str | None, max_points: int | None) -> dict:
+        if resolution is None:
+            # Finest tier reaching back to `start` without too many points, or else the one reaching back the furthest
+            filled = [t for t in self.tiers if t[2].count]
+            covering = [t for t in filled if t[2].first_timestamp <= start]
+            def fits(tier) -> bool:
+                lo, hi = tier[2].range(start, end)
+                return max_points is None or hi - lo <= max_points
+            tier = next((t for t in covering if fits(t)), covering[-1] if covering else None)
+            if tier is None:
+                tier = min(filled, key=lambda t: t[2].first_timestamp, default=self.tiers[0])
+        else:
+            tier = next((t for t in self.tiers if t[0] == resolution), None)
+            if tier is None:
+                raise KeyError(resolution)
+
+        timestamps, series = tier[2].query(columns, start, end, max_points)
+        return {
+            "resolution": tier[0],
+            "timestamps": timestamps.tolist(),
+            "series": {c: [None if math.isnan(v) else round(v, 2) for v in values] for c, values in series.items()},
+        }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for _, _, ring in self.tiers:
+                ring.close()
@@ -0,0 +1,732 @@
+import asyncio, logging, json, math, time
+from collections import defaultdict
+import httpx
+from datetime import datetime
+import config
+from ssh_pool import SSHConnectionPool
+from events import Broadcaster
+from state import StateStore, Snapshot
+from history import HistoryStore
+from controller import CurveController
+from metrics import HostMetrics
+from watchdog import ThermalWatchdog
+from scheduler import PollScheduler
+from actuation import ActuationQueue
+from control_state import ControlStateFile
+from recorder import TraceRecorder
+
+class _HostLogger(logging.LoggerAdapter):
+    """ Prefix log lines with the name of the host they are about. """
+
+    def process(self, msg, kwargs):
+        return f"[{self.extra['host']}] {msg}", kwargs
+
+class IloHost:
+    """ A single iLO: its connections, versioned state, controller and background tasks.
+
+    Args:
+        name (str): Short unique name of the host, used in URLs and file names.
+        host (str): The iLO hostname or IP address.
+        user (str): The iLO user.
+        password (str): The iLO password.
+        poll_slots (asyncio.Semaphore | None): Semaphore shared by every host to cap concurrent polls.
+        ssh_port (int): The iLO SSH port.
+        redfish_url (str | None): Base URL of the Redfish API, https://<host> by default.
+    """
+
+    def __init__(self, name: str, host: str, user: str, password: str, poll_slots: asyncio.Semaphore | None = None,
+                 ssh_port: int = 22, redfish_url: str | None = None):
+        self.name = name
+        self.host = host
+        self.redfish_url = redfish_url or f"https://{host}"
+        self.user = user
+        self.password = password
+        self.poll_slots = poll_slots
+        self.log = _HostLogger(logging.getLogger(), {"host": name})
+        self.metrics = HostMetrics(name)
+
+        # Shared versioned state for fans and temperatures, replaced by a new snapshot on every change
+        manual_default = {fan.name: config.MANUAL_DEFAULT_SPEED for fan in config.HARDWARE.current.enabled_fans}
+        self.state = StateStore(manual_speeds=manual_default)
+
+        # Persistent SSH connections shared by every fan command
+        self.ssh_pool = SSHConnectionPool(
+            host,
+            user,
+            password,
+            size=config.SSH_POOL_SIZE,
+            max_channels=config.SSH_MAX_CHANNELS,
+            keepalive_interval=config.SSH_KEEPALIVE_INTERVAL,
+            backoff_min=config.SSH_RECONNECT_BACKOFF_MIN,
+            backoff_max=config.SSH_RECONNECT_BACKOFF_MAX,
+            metrics=self.metrics,
+            port=ssh_port,
+        )
+
+        # Push stream shared by every dashboard of this host
+        self.broadcaster = Broadcaster()
+
+        # Closed-loop controller used in curve mode
+        self.curve_controller = CurveController(
+            config.CURVE_MODE_CURVES,
+            config.CURVE_MODE_FAN_SENSORS,
+            hysteresis=config.CURVE_MODE_HYSTERESIS,
+            max_step_up=config.CURVE_MODE_MAX_STEP_UP,
+            max_step_down=config.CURVE_MODE_MAX_STEP_DOWN,
+            deadband=config.CURVE_MODE_DEADBAND,
+        )
+
+        # Writes to a fan never overlap, and manual slider changes are coalesced to the latest value
+        self._fan_locks: dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self.actuator = ActuationQueue(
+            self.apply_fan_targets,
+            applied=self.applied_pwm,
+            allowed=lambda: self.state.snapshot.mode == "manual" and not self.failsafe_active,
+            on_done=lambda fan_id: self._notify(),
+        )
+
+        # Thermal watchdog, evaluated on every new snapshot
+        self.watchdog = ThermalWatchdog(
+            config.HARDWARE,
+            rise_horizon=config.WATCHDOG_RISE_HORIZON,
+            rise_debounce=config.WATCHDOG_RISE_DEBOUNCE,
+        )
+        self._failsafe: asyncio.Task | None = None
+
+        # Hardware definition of the last reload, to find the fans a reload drops
+        self._registry = config.HARDWARE.current
+
+        # Adaptive poll interval, and how many dashboards are watching this host
+        self.scheduler = PollScheduler(
+            config.HARDWARE,
+            base=config.POLL_INTERVAL,
+            fast=config.POLL_INTERVAL_FAST,
+            idle=config.POLL_INTERVAL_IDLE,
+            backoff_max=config.POLL_BACKOFF_MAX,
+            hot_margin=config.POLL_HOT_MARGIN,
+            fast_rate=config.POLL_FAST_RATE,
+            rate_window=config.POLL_RATE_WINDOW,
+        )
+        self.viewers = lambda: self.broadcaster.clients + self.long_polls
+        self._wake = asyncio.Event()
+
+        # Temperature and fan speed history and HTTP client, opened in start()
+        self.history: HistoryStore | None = None
+        self.http_client: httpx.AsyncClient | None = None
+        self._etag: str | None = None
+        self._last_payload: bytes | None = None
+
+        # Every snapshot, fan command and mode change, for offline replays of candidate policies
+        self.recorder = TraceRecorder(
+            config.TRACE_DIR / name,
+            retention_days=config.TRACE_RETENTION_DAYS,
+            flush_interval=config.TRACE_FLUSH_INTERVAL,
+        ) if config.TRACE_ENABLED else None
+        self._traced_mode = None
+
+        # Mode, manual speeds and applied PWMs survive restarts, see restore_control_state() and reconcile()
+        self.control_file = ControlStateFile(config.CONTROL_STATE_DIR / f"{name}.json")
+
+        # Called with the host after every state change, e.g. to push the dashboards,
+        # and set for the API clients waiting on a change, see wait_for_change()
+        self.on_change = None
+        self._changed = asyncio.Event()
+        self.long_polls = 0
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def base(self) -> str:
+        """ URL prefix of this host's dashboard and endpoints. """
+        return f"/hosts/{self.name}"
+
+    @property
+    def failsafe_active(self) -> bool:
+        """ Whether the watchdog is currently handing the fans back to the iLO. """
+        return self._failsafe is not None and not self._failsafe.done()
+
+    def applied_pwm(self, fan_id: int) -> int | None:
+        """ PWM currently locked on a fan, None if unlocked or unknown. """
+        fan = config.HARDWARE.current.fans_by_id.get(fan_id)
+        return self.state.snapshot.applied.get(fan.name) if fan else None
+
+    def hardware_changed(self, registry):
+        """ Re-render everything derived from the hardware definition after a reload.
+
+        Fans still locked by the dashboard that the new definition disables or removes are
+        no longer driven by any mode, they are handed back to the iLO.
+        """
+        previous, self._registry = self._registry, registry
+        enabled = {fan.id for fan in registry.enabled_fans}
+        applied = self.state.snapshot.applied
+        dropped = {fan.id: fan.name for fan in previous.enabled_fans
+                   if fan.id not in enabled and applied.get(fan.name) is not None}
+        if dropped:
+            self._tasks.append(asyncio.create_task(self.release_fans(dropped)))
+        self.state.invalidate()
+        self._notify()
+
+    async def release_fans(self, fans: dict, retries: int = 3):
+        """ Unlock fans that are no longer part of the hardware definition.
+
+        Args:
+            fans (dict): Map of fan ID to fan name, as known before the reload.
+            retries (int): Attempts per fan before giving up.
+        """
+        self.log.info(f"Unlocking fans {sorted(fans.values())} dropped from the hardware definition")
+        # A queued slider value must not lock them again
+        await self.actuator.cancel(fans)
+        for attempt in range(1, retries + 1):
+            results = await self.apply_fan_targets({fan_id: None for fan_id in fans}, names=fans)
+            fans = {fan_id: name for fan_id, name in fans.items() if not results[fan_id]}
+            if not fans:
+                return
+            await asyncio.sleep(0.5 * attempt)
+        self.log.error(f"Failed to unlock fans {sorted(fans.values())}, they stay locked until the iLO resets")
+
+    def wake(self):
+        """ Poll right away instead of waiting for the end of the current interval, e.g. when a dashboard connects. """
+        self._wake.set()
+
+    def _notify(self):
+        self.save_control_state()
+        mode = self.state.snapshot.mode
+        if self.recorder is not None and mode != self._traced_mode:
+            self.recorder.mode(time.time(), mode)
+            self._traced_mode = mode
+        if self.on_change is not None:
+            self.on_change(self)
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, since: int, timeout: float) -> Snapshot:
+        """ Wait until the snapshot version differs from `since`, or until the timeout.
+
+        Versions restart at 0 with the process, so a `since` ahead of the current version
+        was seen before a restart and returns at once instead of waiting for the counter
+        to catch up.
+
+        Args:
+            since (int): The last snapshot version known by the caller.
+            timeout (float): Maximum seconds to wait.
+
+        Returns:
+            Snapshot: The current snapshot, unchanged if the timeout expired first.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self.long_polls += 1
+        try:
+            while self.state.snapshot.version == since:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._changed.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+        finally:
+            self.long_polls -= 1
+        return self.state.snapshot
+
+    # Auxiliary functions to manage fans, temps and modes
+    async def apply_fan_targets(self, targets: dict, names: dict | None = None) -> dict:
+        """ Apply a batch of fan targets concurrently over the pooled SSH connections.
+
+        Commands to the same fan are serialized, and the applied state of each fan is
+        recorded as soon as its own command succeeds, so it always matches the last write.
+
+        Args:
+            targets (dict): Map of fan ID to the desired PWM value (0-255), or None to unlock the fan.
+            names (dict | None): Map of fan ID to fan name, for fans missing from the current hardware definition.
+
+        Returns:
+            dict: Map of fan ID to True if the command succeeded, False otherwise.
+        """
+
+        names = names or {fan_id: fan.name for fan_id, fan in config.HARDWARE.current.fans_by_id.items()}
+
+        async def actuate(fan_id: int, pwm) -> bool:
+            command = f"fan p {fan_id} unlock" if pwm is None else f"fan p {fan_id} lock {pwm}"
+            async with self._fan_locks[fan_id]:
+                try:
+                    await self.ssh_pool.run(command)
+                    self.log.info(f"SSH command executed: {command}")
+                except Exception as e:
+                    self.log.error(f"SSH command '{command}' failed: {e}")
+                    return False
+                if self.recorder is not None:
+                    self.recorder.actuation(time.time(), fan_id, pwm)
+
+                # Record what is actually applied on the hardware, failed fans keep their last known state
+                self.state.update(applied={**self.state.snapshot.applied, names[fan_id]: pwm})
+                return True
+
+        # Send every command at once, the pool bounds how many run in parallel
+        fan_ids = list(targets)
+        results = await asyncio.gather(*(actuate(fan_id, targets[fan_id]) for fan_id in fan_ids))
+        self._notify()
+        return dict(zip(fan_ids, results))
+
+    def mode_targets(self, mode: str) -> dict:
+        """ Compute the target of every enabled fan in a mode.
+
+        Args:
+            mode (str): One of "auto", "silent", "manual", or "curve".
+
+        Returns:
+            dict: Map of fan ID to the PWM value (0-255) to lock, or None to unlock the fan.
+        """
+        snapshot = self.state.snapshot
+        enabled_fans = config.HARDWARE.current.enabled_fans
+        if mode == "silent":
+            # Change all fans to silent speed
+            return {fan.id: config.SILENT_MODE_SPEED for fan in enabled_fans}
+        if mode == "manual":
+            # Lock fans to manual speeds, fans added since the last change start at the default speed
+            return {fan.id: snapshot.manual_speeds.get(fan.name, config.MANUAL_DEFAULT_SPEED) for fan in enabled_fans}
+        if mode == "curve":
+            # Start the controller from scratch and lock fans to the speed asked by the curves. Fans without
+            # a curve reading yet stay with the iLO, the controller locks them on the first poll that has one
+            self.curve_controller.reset()
+            targets = self.curve_controller.evaluate(snapshot.temperatures, {})
+            return {fan.id: targets.get(fan.id) for fan in enabled_fans}
+        # Unlock all fans to auto mode, controlled by iLO PIDs
+        return {fan.id: None for fan in enabled_fans}
+
+    async def change_mode(self, mode: str):
+        """ Change the fan mode to auto, manual, silent, or curve.
+
+        All fans are actuated concurrently. If some of them fail, the mode is derived back
+        from the fans that were actually applied so the state matches the hardware.
+        In curve mode failed fans are retried on the next poll instead.
+
+        Args:
+            mode (str): The desired mode, one of "auto", "silent", "manual", or "curve".
+
+        Returns:
+            dict: Map of fan ID to True if the fan was applied, False otherwise.
+            logging.error: If invalid mode if passed.
+        """
+
+        # Validate the mode
+        if mode not in {"auto", "silent", "manual", "curve"}:
+            return self.log.error(f"Invalid mode: {mode}. Expected one of 'auto', 'silent', 'manual', or 'curve'.")
+
+        # Queued slider values must not land after the new mode is applied
+        await self.actuator.cancel()
+
+        state = self.state
+        results = await self.apply_fan_targets(self.mode_targets(mode))
+
+        if mode == "silent":
+            fans = config.HARDWARE.current.fans_by_id
+            manual_speeds = dict(state.snapshot.manual_speeds)
+            for fan_id, ok in results.items():
+                if ok:
+                    manual_speeds[fans[fan_id].name] = config.SILENT_MODE_SPEED
+            state.update(manual_speeds=manual_speeds)
+
+        if all(results.values()) or mode == "curve":
+            state.update(mode=mode)
+        else:
+            # Partial failure, reflect the real hardware state instead of the requested one
+            failed = [fan_id for fan_id, ok in results.items() if not ok]
+            snapshot = state.update(mode=derive_mode(state.snapshot))
+            self.log.error(f"Mode change to '{mode}' failed for fans {failed}, mode is now '{snapshot.mode}'")
+
+        # Leaving auto mode ends any idle poll interval, the watchdog must see the next readings quickly
+        if state.snapshot.mode != "auto":
+            self.wake()
+        self._notify()
+        return results
+
+    def set_manual_speed(self, fan_id: int, speed: int) -> str | None:
+        """ Set the speed of a fan in manual mode, see set_manual_speeds().
+
+        Args:
+            fan_id (int): The ID of the fan to set the speed for.
+            speed (int): The desired speed as a % (0-100).
+
+        Returns:
+            str: "applied" if the fan already runs at this speed, "pending" if the command is queued.
+            logging.warning: If the mode is not manual.
+            logging.error: If the speed is out of range or the fan ID is invalid."""
+        statuses = self.set_manual_speeds({fan_id: speed})
+        return statuses[fan_id] if statuses else None
+
+    def set_manual_speeds(self, speeds: dict) -> dict | None:
+        """ Set the speed of several fans in manual mode.
+
+        The speeds are recorded right away and queued on the actuation queue, which only
+        sends the latest value of each fan and skips values already applied. Nothing is
+        changed if any fan ID or speed is invalid.
+
+        Args:
+            speeds (dict): Map of fan ID to the desired speed as a % (0-100).
+
+        Returns:
+            dict: Map of fan ID to "applied" if the fan already runs at this speed, "pending" if the command is queued.
+            logging.warning: If the mode is not manual.
+            logging.error: If a speed is out of range or a fan ID is invalid."""
+
+        state = self.state
+
+        # Check if the mode is manual
+        if state.snapshot.mode != "manual":
+            return self.log.warning(f"Cannot set manual speed when not in manual mode. Expected mode: manual, but got: {state.snapshot.mode}")
+
+        registry = config.HARDWARE.current
+        fans = {}
+        for fan_id, speed in speeds.items():
+            # Check if the speed is within valid range
+            if not (0 <= speed <= 100):
+                return self.log.error(f"Invalid speed: {speed}. Must be between 0 and 100.")
+
+            # Find the fan by ID
+            fan = registry.fans_by_id.get(fan_id)
+            if not fan or not fan.enabled:
+                return self.log.error(f"Invalid fan ID: {fan_id}")
+
+            # Convert percentage to 0-255 range
+            fans[fan_id] = (fan.name, math.ceil((speed / 100) * 255))
+
+        # Remember the speeds and queue the lock commands
+        state.update(manual_speeds={**state.snapshot.manual_speeds, **dict(fans.values())})
+        statuses = {fan_id: self.actuator.submit(fan_id, pwm) for fan_id, (_, pwm) in fans.items()}
+        self._notify()
+        return statuses
+
+    async def run_curve_controller(self, snapshot: Snapshot):
+        """ Evaluate the fan curves against a new snapshot and actuate the fans whose target changed. """
+        if snapshot.mode != "curve" or self.failsafe_active:
+            return
+        registry = config.HARDWARE.current
+        applied = {fan.id: snapshot.applied.get(fan.name) for fan in registry.enabled_fans}
+        targets = self.curve_controller.evaluate(snapshot.temperatures, applied)
+        targets = {fan_id: pwm for fan_id, pwm in targets.items() if fan_id in applied}
+        if targets:
+            self.log.info(f"[CURVE] Adjusting fans: {targets}")
+            await self.apply_fan_targets(targets)
+
+    def save_control_state(self):
+        """ Save the mode, manual speeds and applied PWMs, if they changed.
+
+        The controller settings are not saved, they always come from config.py.
+        """
+        snapshot = self.state.snapshot
+        self.control_file.save({
+            "mode": snapshot.mode,
+            "manual_speeds": dict(snapshot.manual_speeds),
+            "applied": dict(snapshot.applied),
+        })
+
+    def restore_control_state(self):
+        """ Restore the control state saved by a previous run, without touching the fans. """
+        saved = self.control_file.load()
+        if not saved:
+            return
+        fans = config.HARDWARE.current.fans_by_name
+        manual_speeds = {**self.state.snapshot.manual_speeds}
+        manual_speeds.update({k: v for k, v in saved.get("manual_speeds", {}).items() if k in fans and fans[k].enabled})
+        applied = {k: v for k, v in saved.get("applied", {}).items() if k in fans and fans[k].enabled}
+        mode = saved.get("mode", "auto")
+        if mode not in {"auto", "silent", "manual", "curve"}:
+            mode = "auto"
+        self.state.update(mode=mode, manual_speeds=manual_speeds, applied=applied)
+        self.log.info(f"Restored mode '{mode}' from {self.control_file.path}")
+
+    async def reconcile(self):
+        """ Bring the fans in line with the restored mode, only actuating the fans that differ.
+
+        A locked fan is considered in place if it was saved at its target PWM and its current
+        reading matches that PWM. Fans that cannot be confirmed are forgotten and re-applied.
+        Unlocks are always sent: a reading cannot tell an unlocked fan from a locked one, and
+        the saved state lags behind a batch of commands interrupted by a crash.
+        """
+        polled = await self.poll_once()
+        if self.failsafe_active:
+            # The watchdog already took over the fans on this first read
+            return await self._failsafe
+        snapshot = self.state.snapshot
+        targets = self.mode_targets(snapshot.mode)
+
+        applied, stale = {}, {}
+        for fan in config.HARDWARE.current.enabled_fans:
+            name, target = fan.name, targets[fan.id]
+            reading = snapshot.fans.get(name) if polled else None
+            in_place = (target is not None and snapshot.applied.get(name) == target and reading is not None
+                        and abs(reading - target / 255 * 100) <= config.RECONCILE_TOLERANCE)
+            if in_place:
+                applied[name] = target
+            else:
+                stale[fan.id] = target
+
+        self.state.update(applied=applied)
+        if not stale:
+            self.log.info(f"Fans already in '{snapshot.mode}' mode, nothing to reconcile")
+            return self._notify()
+
+        self.log.info(f"Reconciling fans {sorted(stale)} with '{snapshot.mode}' mode")
+        results = await self.apply_fan_targets(stale)
+        if not all(results.values()) and snapshot.mode != "curve":
+            # Same as a failed mode change, reflect the fans actually known
+            failed = [fan_id for fan_id, ok in results.items() if not ok]
+            snapshot = self.state.update(mode=derive_mode(self.state.snapshot))
+            self.log.error(f"Reconciliation failed for fans {failed}, mode is now '{snapshot.mode}'")
+        self._notify()
+
+    def record_history(self, snapshot: Snapshot):
+        """ Append the readings of a snapshot to the history store. """
+        if self.history is None:
+            return
+        try:
+            self.history.append(time.time(), {**snapshot.temperatures, **snapshot.fans})
+        except Exception as e:
+            self.log.exception(f"Failed to record history: {e}")
+
+    def create_http_client(self) -> httpx.AsyncClient:
+        """ Create the long-lived HTTP client used to poll the iLO Redfish API.
+
+        Connections are kept alive between polls so the iLO only pays for the TLS handshake once.
+
+        Returns:
+            httpx.AsyncClient: The configured client.
+        """
+        return httpx.AsyncClient(
+            base_url=self.redfish_url,
+            auth=(self.user, self.password),
+            verify=False,
+            timeout=httpx.Timeout(config.HTTP_TIMEOUT, connect=config.HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+            ),
+        )
+
+    # Concurrent background tasks for polling iLO data and thermal watchdog
+    async def poll_once(self) -> bool:
+        """ Poll the Redfish thermal endpoint once and run everything that reacts to a new snapshot.
+
+        Returns:
+            bool: True if the poll succeeded, False otherwise.
+        """
+        state = self.state
+        client = self.http_client
+        try:
+            # Let the iLO answer 304 if the thermal document did not change
+            headers = {"If-None-Match": self._etag} if self._etag else {}
+            if self.poll_slots is not None:
+                async with self.poll_slots:
+                    started = time.perf_counter()
+                    response = await client.get("/redfish/v1/chassis/1/Thermal/", headers=headers)
+            else:
+                started = time.perf_counter()
+                response = await client.get("/redfish/v1/chassis/1/Thermal/", headers=headers)
+            received = time.perf_counter()
+            self.metrics.poll_seconds.observe(received - started)
+
+            if response.status_code == 304:
+                self.log.debug("Thermal data not modified (ETag match)")
+                if self.recorder is not None:
+                    self.recorder.tick(time.time())
+            elif response.status_code == 200:
+                self.log.debug("Fetched iLO data successfully")
+                self._etag = response.headers.get("ETag")
+
+                # Skip parsing if the payload is byte-for-byte identical to the previous one
+                if response.content != self._last_payload:
+                    self._last_payload = response.content
+
+                    # Parse the JSON response
+                    response_json = response.json()
+                    fans = {fan["FanName"]:fan.get("CurrentReading") for fan in response_json.get("Fans", [])}
+                    temperatures = {temp["Name"]:temp.get("ReadingCelsius") for temp in response_json.get("Temperatures", [])}
+
+                    # Update the shared state
+                    state.update(fans=fans, temperatures=temperatures)
+                    if self.recorder is not None:
+                        self.recorder.snapshot(time.time(), temperatures, fans)
+
+                    self.log.debug(f"Fans: {json.dumps(fans)}")
+                    self.log.debug(f"Temperatures: {json.dumps(temperatures)}")
+                elif self.recorder is not None:
+                    self.recorder.tick(time.time())
+            else:
+                self.metrics.poll_errors["status"].inc()
+                self.log.error(f"Failed to fetch iLO data: STATUS_CODE={response.status_code} TEXT='{response.text}'")
+                return False
+
+            snapshot = state.update(last_updated=datetime.now().strftime("%H:%M:%S"), polled_at=time.time())
+            self.log.debug(f"Thermal endpoint hit at {snapshot.last_updated} (version {snapshot.version})")
+            self.check_thermals(snapshot, received)
+            self.record_history(snapshot)
+            self._notify()
+            await self.run_curve_controller(snapshot)
+            return True
+        except httpx.RequestError as e:
+            self.metrics.poll_errors["http"].inc()
+            self.log.error(f"HTTP request error: {e}")
+        except Exception as e:
+            self.metrics.poll_errors["unexpected"].inc()
+            self.log.exception(f"Unexpected error during iLO polling: {e}")
+        return False
+
+    async def poll_ilo_data(self, initial_delay: float = 0):
+        state = self.state
+
+        # Stagger the first poll so hosts do not all hit the network at the same time
+        await asyncio.sleep(initial_delay)
+        while True:
+            ok = await self.poll_once()
+
+            # Pick the next poll interval, only slowing down while the iLO is in control and nobody is watching
+            snapshot = state.snapshot
+            locked = snapshot.mode != "auto"
+            can_idle = not locked and not self.viewers()
+            interval = self.scheduler.next_interval(snapshot.temperatures, time.monotonic(), ok, can_idle, locked)
+            if state.update(poll_interval=interval) is not snapshot:
+                self._notify()
+
+            # Wait for the next poll interval, or until woken up
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def check_thermals(self, snapshot: Snapshot, received: float):
+        """ Run the thermal watchdog on a new snapshot, starting the failsafe if a sensor is flagged.
+
+        Args:
+            snapshot (Snapshot): The snapshot built from the poll.
+            received (float): perf_counter() time the poll response was received.
+        """
+        try:
+            started = time.perf_counter()
+            flagged = self.watchdog.evaluate(snapshot.temperatures, received)
+            self.metrics.watchdog_seconds.observe(time.perf_counter() - started)
+        except Exception as e:
+            return self.log.exception(f"[WATCHDOG] Unexpected error: {e}")
+
+        # Only act when the fans are not under iLO control, and only once at a time
+        if not flagged or snapshot.mode not in {"manual", "silent", "curve"}:
+            return
+        if self.failsafe_active:
+            return
+
+        for verbose_name, value, safe_max, reason in flagged:
+            self.log.warning(f"[WATCHDOG] {verbose_name} at {value}°C {reason} (safe-max {safe_max}°C). Forcing auto mode.")
+        self.metrics.watchdog_triggers.inc()
+        self._failsafe = asyncio.create_task(self._run_failsafe(received))
+
+    async def _run_failsafe(self, detected: float):
+        """ Hand the fans back to the iLO and record the detection-to-actuation latency. """
+        try:
+            await self.change_mode("auto")
+            reaction = time.perf_counter() - detected
+            self.metrics.watchdog_reaction_seconds.observe(reaction)
+            self.log.warning(f"[WATCHDOG] Fans back to auto {reaction * 1000:.0f}ms after detection")
+        except Exception as e:
+            self.log.exception(f"[WATCHDOG] Failsafe failed: {e}")
+
+    async def _run(self, initial_delay: float):
+        """ Reconcile the fans with the restored state, then keep polling. """
+        # Stagger the reconciliation too, its first poll and fan commands would otherwise hit every host at once
+        await asyncio.sleep(initial_delay)
+        try:
+            await self.reconcile()
+        except Exception as e:
+            self.log.exception(f"Reconciliation failed: {e}")
+        await self.poll_ilo_data()
+
+    async def start(self, initial_delay: float = 0):
+        """ Open the history and HTTP client, restore the saved control state and start the background tasks.
+
+        Nothing waits on the iLO here, the fans are reconciled in the background.
+
+        Args:
+            initial_delay (float): Seconds to wait before the first poll.
+        """
+        # History columns are fixed for the life of the process, sensors added by a reload are recorded after a restart
+        registry = config.HARDWARE.current
+        self.history = HistoryStore(
+            config.HISTORY_DIR / self.name,
+            [s.name for s in registry.sensors] + [f.name for f in registry.fans],
+            config.HISTORY_TIERS,
+        )
+        self.http_client = self.create_http_client()
+        self.restore_control_state()
+        config.HARDWARE.listeners.append(self.hardware_changed)
+        self._tasks = [asyncio.create_task(self._run(initial_delay))]
+
+    async def stop(self):
+        """ Cancel the background tasks and close every connection and file. """
+        await self.actuator.cancel()
+        if self.hardware_changed in config.HARDWARE.listeners:
+            config.HARDWARE.listeners.remove(self.hardware_changed)
+        if self._failsafe is not None:
+            self._tasks.append(self._failsafe)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.http_client is not None:
+            await self.http_client.aclose()
+        await self.ssh_pool.close()
+        if self.history is not None:
+            self.history.close()
+        if self.recorder is not None:
+            self.recorder.close()
+
+def derive_mode(snapshot: Snapshot) -> str:
+    """ Derive the fan mode from the PWM values actually applied on the hardware.
+
+    Args:
+        snapshot (Snapshot): The state snapshot to derive the mode from.
+
+    Returns:
+        str: "auto" if no enabled fan is known to be locked, "silent" if all of them are locked
+        at the silent speed, "manual" otherwise.
+    """
+    applied = [snapshot.applied[f.name] for f in config.HARDWARE.current.enabled_fans if f.name in snapshot.applied]
+    if all(pwm is None for pwm in applied):
+        return "auto"
+    if all(pwm == config.SILENT_MODE_SPEED for pwm in applied):
+        return "silent"
+    return "manual"
+
+class Fleet:
+    """ Every iLO controlled by this process.
+
+    Hosts are polled concurrently on staggered schedules, with a global cap on the
+    number of Redfish requests in flight.
+
+    Args:
+        hosts (list): Host definitions, dicts with "name", "host", "user", "password" and optionally "ssh_port" and "redfish_url".
+        poll_concurrency (int): Maximum number of concurrent polls across all hosts.
+    """
+
+    def __init__(self, hosts: list, poll_concurrency: int):
+        slots = asyncio.Semaphore(poll_concurrency)
+        self.hosts = {
+            h["name"]: IloHost(h["name"], h["host"], h["user"], h["password"], slots, h.get("ssh_port", 22), h.get("redfish_url"))
+            for h in hosts
+        }
+        self.default = next(iter(self.hosts.values()))
+
+    def __iter__(self):
+        return iter(self.hosts.values())
+
+    def __len__(self):
+        return len(self.hosts)
+
+    def get(self, name: str) -> IloHost | None:
+        return self.hosts.get(name)
+
+    async def start(self):
+        """ Start every host concurrently, spreading their first polls over one poll interval. """
+        step = config.POLL_INTERVAL / len(self.hosts)
+        await asyncio.gather(*(host.start(i * step) for i, host in enumerate(self)))
+
+    async def stop(self):
+        await asyncio.gather(*(host.stop() for host in self))
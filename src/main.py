@@ -1,349 +1,417 @@
-import asyncio, logging, json, math
-import httpx
-import asyncssh
-from datetime import datetime
-from fastapi import FastAPI, Request, Form
+import asyncio, logging, math, hashlib, json, time
+from fastapi import FastAPI, APIRouter, Request, Form, Query, Depends, HTTPException
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, Response, JSONResponse
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
+from pydantic import BaseModel
 import config
+from events import Broadcaster, format_sse
+from state import Snapshot, memoized
+from host import Fleet, IloHost
+from registry import Group
+from metrics import RENDER_SECONDS, register_fleet
 from pathlib import Path
 
 # Set up basic logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Shared states for fans and temperatures
-manual_default = {v["name"]:config.MANUAL_DEFAULT_SPEED for v in config.FANS if v["enabled"]}
-ilo_state = {
-    "fans": {},
-    "temperatures": {},
-    "last_updated": None,
-    "manual_speeds": manual_default,
-    "mode": "auto" # auto, manual, silent
-}
-
-# Auxiliary functions to manage fans, temps and modes
-async def ilo_ssh_command(command: str) -> str:
-    """ Execute a command via SSH on the iLO server.
-    
-    Args:
-        command (str): The command to execute on the iLO server.
-        
-    Returns:
-        str: The output of the command if successful.
-        logging.error: If the SSH command fails.
-    """
-    try:
-        async with asyncssh.connect(
-            config.ILO_HOST,
-            username=config.ILO_USER,
-            password=config.ILO_PASS,
-            known_hosts=None,                           # skip host verification
-            kex_algs=["diffie-hellman-group1-sha1"],    # required for older iLOs
-            server_host_key_algs=["ssh-rsa"],           # also for compatibility
-        ) as conn:
-            result = await conn.run(command, check=True)
-            logging.info(f"SSH command executed: {command}")
-            return result.stdout
-    except Exception as e:
-        logging.error(f"SSH command failed: {e}")
-        return f"Error: {e}"
-    
-async def change_mode(mode: str):
-    """ Change the fan mode to auto, manual, or silent.
+# Every controlled iLO, each with its own connections, state and background tasks
+fleet = Fleet(config.ILO_HOSTS, config.FLEET_POLL_CONCURRENCY)
 
-    Args:
-        mode (str): The desired mode, one of "auto", "silent", or "manual".
+register_fleet(fleet)
 
-    Returns:
-        None: If the operation is successful.
-        logging.error: If the SSH command fails or invalid mode if passed.
-    """
+# Push stream of the fleet overview
+fleet_broadcaster = Broadcaster()
 
-    # Validate the mode
-    if mode not in {"auto", "silent", "manual"}:
-        return logging.error(f"Invalid mode: {mode}. Expected one of 'auto', 'silent', or 'manual'.")
-
-    if mode == "silent":
-        # Change all fans to silent speed
-        for fan in config.FANS:
-            if fan["enabled"]:
-                await ilo_ssh_command(f"fan p {fan['id']} lock {config.SILENT_MODE_SPEED}")
-                ilo_state["manual_speeds"][fan["name"]] = config.SILENT_MODE_SPEED
-
-        # Set the mode to silent
-        ilo_state["mode"] = "silent"
-    elif mode == "manual":
-        # Lock fans to manual speeds
-        for fan in config.FANS:
-            if fan["enabled"]:
-                await ilo_ssh_command(f"fan p {fan['id']} lock {ilo_state['manual_speeds'][fan['name']]}")
-
-        # Set the mode to manual
-        ilo_state["mode"] = "manual"
-    else:
-        # Unlock all fans to auto mode, controlled by iLO PIDs
-        for fan in config.FANS:
-            if fan["enabled"]:
-                await ilo_ssh_command(f"fan p {fan['id']} unlock")
-        
-        # Set the mode to auto
-        ilo_state["mode"] = "auto"
-
-async def set_manual_speed(fan_id: int, speed: int):
-    """ Set the speed of a fan in manual mode.
-    Args:
-        fan_id (int): The ID of the fan to set the speed for.
-        speed (int): The desired speed as a % (0-100).
-    
-    Returns:
-        None: If the operation is successful.
-        logging.warning: If the mode is not manual.
-        logging.error: If the speed is out of range or fan ID is invalid."""
-
-    # Check if the mode is manual
-    if ilo_state["mode"] != "manual":
-        return logging.warning(f"Cannot set manual speed when not in manual mode. Expected mode: manual, but got: {ilo_state['mode']}") 
-
-    # Check if the speed is within valid range
-    if not (0 <= speed <= 100):
-        return logging.error(f"Invalid speed: {speed}. Must be between 0 and 100.")
-
-    # Find the fan by ID
-    fan = next((f for f in config.FANS if f["id"] == fan_id and f["enabled"]), None)
-    if not fan:
-        return logging.error(f"Invalid fan ID: {fan_id}")
-    
-    # Convert percentage to 0-255 range
-    pwm_value = math.ceil((speed / 100) * 255)
-
-    # Lock the fan to the specified speed
-    await ilo_ssh_command(f"fan p {fan['id']} lock {pwm_value}")
-    ilo_state["manual_speeds"][fan["name"]] = pwm_value
-
-def get_fan_speeds() -> list:
+@memoized("fans")
+def get_fan_speeds(snapshot: Snapshot) -> list:
     """
-    Get the current fan speeds from the shared state and format them for display.
+    Get the fan speeds of a state snapshot and format them for display.
     iLO by default returns fan speeds in % (0-100).
+    The result is computed once per snapshot and must not be modified.
+
+    Args:
+        snapshot (Snapshot): The state snapshot to read the fan speeds from.
     
     Returns:
         list: A list of dictionaries containing fan names and their current speeds.
     """
 
-    # Make a copy of the current fans from the shared state
-    fans_state = ilo_state["fans"].copy()
-    fans_config = config.FANS.copy()
-
     # Build fans state list
-    fans = [{"verbose-name":fan["verbose-name"], "speed":fans_state[fan["name"]]} for fan in fans_config if fan["enabled"]]
+    fans = [{"verbose-name":fan.verbose_name, "speed":snapshot.fans[fan.name]} for fan in config.HARDWARE.current.enabled_fans]
 
     return fans
 
-def get_temp_readings() -> list:
+@memoized("temperatures")
+def get_temp_readings(snapshot: Snapshot) -> list:
     """
-    Get the current temperature readings from the shared state and format them for display.
+    Get the temperature readings of a state snapshot and format them for display.
     iLO by default returns temperatures in Celsius.
+    The result is computed once per snapshot and must not be modified.
+
+    Sensors declared in an aggregation group of the hardware definition (e.g. every DIMM as "Memory")
+    are shown as a single reading. The display order is precomputed by the registry.
 
-    This function aggregates memory temperatures (DIMM) into a single "Memory" reading.
-    It filters out DIMM temperatures from the main temperature readings and calculates the average for memory.
+    Args:
+        snapshot (Snapshot): The state snapshot to read the temperatures from.
     
     Returns:
         list: A list of dictionaries containing temperature names, values, and safe max limits.
     """
 
-    # Make a copy of the current temperatures from the shared state
-    temps_state = ilo_state["temperatures"].copy()
-    temps_config = config.TEMPERATURE_SENSORS.copy()
-    
-    # Aggregate memory temperatures
-    mem_values = [int(v) for k, v in temps_state.items() if "DIMM" in k]
-    mem_temp = round(sum(mem_values) / len(mem_values), 1) if mem_values else None
+    temps_state = snapshot.temperatures
 
-    # Build temperature readings list
-    temp_readings = [{"verbose-name":temp["verbose-name"], "value":int(temps_state[temp["name"]]), "safe-max": temp["safe-max"]} for temp in temps_config if temp["enabled"] and "DIMM" not in temp["name"]]
-    
-    # Add aggregated memory temperature if available
-    if mem_temp is not None:
-        temp_readings.append({"verbose-name": "Memory", "value": mem_temp, "safe-max": 85})
-    
-    # Sort the readings by verbose name, for consistent display
-    temp_readings.sort(key=lambda x: x["verbose-name"])  # Sort by verbose name
+    # Build temperature readings list, with one reading per aggregation group
+    temp_readings = []
+    for item in config.HARDWARE.current.display:
+        if isinstance(item, Group):
+            value = item.value(temps_state)
+        else:
+            value = temps_state.get(item.name)
+            value = int(value) if value is not None else None
+        if value is not None:
+            temp_readings.append({"verbose-name": item.verbose_name, "value": value, "safe-max": item.safe_max})
 
     return temp_readings
 
-# Concurrent background tasks for polling iLO data and thermal watchdog
-async def poll_ilo_data():
-    while True:
-        try:
-            async with httpx.AsyncClient(verify=False) as client:
-                response = await client.get(f"https://{config.ILO_HOST}/redfish/v1/chassis/1/Thermal/", auth=(config.ILO_USER, config.ILO_PASS))
-                if response.status_code == 200:
-                    logging.debug("Fetched iLO data successfully")
-
-                    # Parse the JSON response
-                    response_json = response.json()
-                    fans = {fan["FanName"]:fan.get("CurrentReading") for fan in response_json.get("Fans", [])}
-                    temperatures = {temp["Name"]:temp.get("ReadingCelsius") for temp in response_json.get("Temperatures", [])}
-
-                    # Update the shared state
-                    ilo_state["fans"] = fans
-                    ilo_state["temperatures"] = temperatures
-                    ilo_state["last_updated"] = datetime.now().strftime("%H:%M:%S")
-
-                    logging.debug(f"Fans: {json.dumps(fans)}")
-                    logging.debug(f"Temperatures: {json.dumps(temperatures)}")
-                    logging.debug(f"Thermal endpoint hit at {ilo_state['last_updated']}")
-                else:
-                    logging.error(f"Failed to fetch iLO data: STATUS_CODE={response.status_code} TEXT='{response.text}'")
-        except httpx.RequestError as e:
-            logging.error(f"HTTP request error: {e}")
-        except Exception as e:
-            logging.exception(f"Unexpected error during iLO polling: {e}")
-        
-        # Wait for the next poll interval
-        await asyncio.sleep(config.POLL_INTERVAL)
-
-async def thermal_watchdog():
-    while True:
-        try:
-            # Check thermals if in manual or silent mode
-            if ilo_state["mode"] in {"manual", "silent"}:
-                temps_state = ilo_state["temperatures"].copy()
-
-                # Log the hottest sensor
-                hottest = max(temps_state.items(), key=lambda kv: kv[1] or 0)
-                logging.info(f"[WATCHDOG] Hottest sensor: {hottest[0]} = {hottest[1]}°C")
-
-                for sensor in config.TEMPERATURE_SENSORS:
-                    safe_max = sensor["safe-max"]
-                    value = temps_state.get(sensor["name"])
-
-                    # If there is a reading and it exceeds the safe max, switch to auto mode
-                    if value is not None and value >= safe_max:
-                        logging.warning(
-                            f"[WATCHDOG] {sensor['verbose-name']} at {value}°C exceeds safe-max ({safe_max}°C). Forcing auto mode.")
-                        await change_mode("auto")
-        except Exception as e:
-            logging.exception(f"[WATCHDOG] Unexpected error: {e}")
-        
-        await asyncio.sleep(config.POLL_INTERVAL)
+# Rendering of the dashboard partials, memoized per snapshot and shared by the HTMX endpoints and the push stream
+def _rendered(html: str) -> tuple:
+    return html, f'"{hashlib.blake2b(html.encode(), digest_size=8).hexdigest()}"'
+
+@memoized("temperatures")
+@RENDER_SECONDS.labels("temps").time()
+def render_temps(snapshot: Snapshot) -> tuple:
+    return _rendered(templates.get_template("partials/temps.html").render(temps=get_temp_readings(snapshot)))
+
+@memoized("fans")
+@RENDER_SECONDS.labels("fans").time()
+def render_fans(snapshot: Snapshot) -> tuple:
+    return _rendered(templates.get_template("partials/fans.html").render(fans=get_fan_speeds(snapshot)))
+
+@memoized("mode", "manual_speeds", "last_updated", "poll_interval")
+@RENDER_SECONDS.labels("mode").time()
+def render_mode(snapshot: Snapshot, base: str) -> tuple:
+    return _rendered(templates.get_template("partials/mode.html").render(
+        base=base,
+        current_mode=snapshot.mode,
+        manual_speeds=snapshot.manual_speeds,
+        last_update=snapshot.last_updated or "--:--:--",
+        poll_interval=snapshot.poll_interval,
+    ))
+
+@memoized("temperatures", "fans", "mode", "last_updated")
+@RENDER_SECONDS.labels("fleet_row").time()
+def render_fleet_row(snapshot: Snapshot, name: str) -> tuple:
+    temps = get_temp_readings(snapshot) if snapshot.temperatures else []
+    speeds = [f["speed"] for f in get_fan_speeds(snapshot)] if snapshot.fans else []
+    return _rendered(templates.get_template("partials/fleet_row.html").render(
+        name=name,
+        current_mode=snapshot.mode,
+        hottest=max(temps, key=lambda t: t["value"] / t["safe-max"], default=None),
+        fan_speed=round(sum(speeds) / len(speeds)) if speeds else None,
+        last_update=snapshot.last_updated or "--:--:--",
+    ))
+
+def partial_response(request: Request, rendered: tuple) -> Response:
+    """ Serve a rendered partial, answering 304 if the client already has it.
+
+    Args:
+        request (Request): The incoming request.
+        rendered (tuple): The (html, etag) pair returned by one of the render functions.
+
+    Returns:
+        Response: The partial with its ETag, or an empty 304 response.
+    """
+    html, etag = rendered
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return HTMLResponse(html, headers={"ETag": etag})
+
+def publish_state(host: IloHost):
+    """ Push the partials that changed to the connected dashboards of a host and to the fleet overview.
+
+    Rendering happens once per state change, no matter how many clients are connected.
+    """
+    snapshot = host.state.snapshot
+    try:
+        # The mode panel is always published, so the fans can be set back to auto while Redfish is down
+        host.broadcaster.publish("mode", render_mode(snapshot, host.base)[0])
+        # Readings only exist once the first poll has completed
+        if snapshot.temperatures:
+            host.broadcaster.publish("temps", render_temps(snapshot)[0])
+            host.broadcaster.publish("fans", render_fans(snapshot)[0])
+        for fan in config.HARDWARE.current.enabled_fans:
+            host.broadcaster.publish(f"status-fan{fan.id}", host.actuator.status(fan.id))
+        fleet_broadcaster.publish(f"host-{host.name}", render_fleet_row(snapshot, host.name)[0])
+    except Exception as e:
+        host.log.exception(f"Failed to publish state: {e}")
+
+def event_stream(request: Request, broadcaster: Broadcaster) -> StreamingResponse:
+    """ Server-sent events stream pushing re-rendered partials whenever the state changes. """
+
+    async def stream():
+        async for item in broadcaster.subscribe():
+            if await request.is_disconnected():
+                break
+            if item is None:
+                yield ": keepalive\n\n"
+            else:
+                yield format_sse(*item)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",
+    })
 
 # Start the FastAPI app with lifespan context manager
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await change_mode("auto")  # Ensure we start in auto mode
-    poll_task = asyncio.create_task(poll_ilo_data())
-    watchdog_task = asyncio.create_task(thermal_watchdog())
+    for host in fleet:
+        host.on_change = publish_state
+        host.viewers = lambda host=host: host.broadcaster.clients + host.long_polls + fleet_broadcaster.clients
+    await fleet.start()
+    # Render the restored state right away, the first poll may take a while or fail
+    for host in fleet:
+        publish_state(host)
+    # Reload the hardware definition on file change or SIGHUP, the pollers keep running
+    watcher = asyncio.create_task(config.HARDWARE.watch(config.HARDWARE_RELOAD_INTERVAL))
     yield  # App is running
-    poll_task.cancel()
-    watchdog_task.cancel()
-    try:
-        await asyncio.gather(poll_task, watchdog_task)
-    except asyncio.CancelledError:
-        pass
+    watcher.cancel()
+    await fleet.stop()
 
 app = FastAPI(lifespan=lifespan)
 
 templates = Jinja2Templates(directory=config.TEMPLATES_DIR)
 app.mount("/static", StaticFiles(directory=config.STATIC_DIR), name="static")
 
-# Serving home page
+def get_host(request: Request) -> IloHost:
+    """ Resolve the host of a request from its /hosts/{host_name} prefix, defaulting to the first host. """
+    name = request.path_params.get("host_name")
+    if name is None:
+        return fleet.default
+    host = fleet.get(name)
+    if host is None:
+        raise HTTPException(status_code=404, detail=f"Unknown host: {name}")
+    return host
+
+# Serving home page, the fleet overview when several hosts are configured
 @app.get("/", response_class=HTMLResponse)
 def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request, "ilo_host": config.ILO_HOST})
-
-# Serving partials for HTMX
-@app.get("/temps", response_class=HTMLResponse)
-async def temps(request: Request):
-    # Get the current temperature readings from the shared state
-    temps = get_temp_readings()
-
-    return templates.TemplateResponse("partials/temps.html", {"request": request, "temps": temps})
-
-@app.get("/fans", response_class=HTMLResponse)
-async def fans(request: Request):
-    # Get the current fan speeds from the shared state
-    fans = get_fan_speeds()
-
-    return templates.TemplateResponse("partials/fans.html", {"request": request, "fans": fans})
-
-@app.get("/info", response_class=HTMLResponse)
-async def info(request: Request):
-    # Make a copy of the current state
-    state_copy = ilo_state.copy()
-    last_update = state_copy.get("last_updated", "--:--:--")
-
-    info = {
-        "current_mode": state_copy["mode"],
-        "last_update": last_update
-    }
-    return templates.TemplateResponse("partials/mode.html", {"request": request, **info})
-
-@app.get("/mode-panel", response_class=HTMLResponse)
-async def mode_panel(request: Request):
-    return templates.TemplateResponse("partials/mode.html", {
+    if len(fleet) > 1:
+        return templates.TemplateResponse("fleet.html", {
+            "request": request,
+            "rows": [(host.name, render_fleet_row(host.state.snapshot, host.name)[0]) for host in fleet],
+        })
+    return dashboard(request, fleet.default)
+
+@app.get("/metrics")
+def metrics():
+    """ Prometheus metrics: latest readings of every host, and latency histograms of the hot paths. """
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/fleet/events")
+async def fleet_events(request: Request):
+    for host in fleet:
+        host.wake()
+    return event_stream(request, fleet_broadcaster)
+
+@app.get("/hosts/{host_name}/", response_class=HTMLResponse)
+def dashboard(request: Request, host: IloHost = Depends(get_host)):
+    return templates.TemplateResponse("index.html", {
         "request": request,
-        "current_mode": ilo_state["mode"],
-        "manual_speeds": ilo_state.get("manual_speeds", {}),
-        "last_update": ilo_state.get("last_updated", "--:--:--"),
+        "ilo_host": host.host,
+        "host_name": host.name,
+        "base": host.base,
+        "fleet": len(fleet) > 1,
     })
 
-@app.get("/manual-config", response_class=HTMLResponse)
-async def manual_config(request: Request):
+# Per-host endpoints, served under /hosts/{host_name} and, for the first host, at the root
+router = APIRouter()
+
+# Serving partials for HTMX
+@router.get("/temps", response_class=HTMLResponse)
+async def temps(request: Request, host: IloHost = Depends(get_host)):
+    # Serve the temperature readings rendered for the current snapshot
+    return partial_response(request, render_temps(host.state.snapshot))
+
+@router.get("/fans", response_class=HTMLResponse)
+async def fans(request: Request, host: IloHost = Depends(get_host)):
+    # Serve the fan speeds rendered for the current snapshot
+    return partial_response(request, render_fans(host.state.snapshot))
+
+@router.get("/info", response_class=HTMLResponse)
+async def info(request: Request, host: IloHost = Depends(get_host)):
+    return partial_response(request, render_mode(host.state.snapshot, host.base))
+
+@router.get("/mode-panel", response_class=HTMLResponse)
+async def mode_panel(request: Request, host: IloHost = Depends(get_host)):
+    return partial_response(request, render_mode(host.state.snapshot, host.base))
+
+@router.get("/manual-config", response_class=HTMLResponse)
+async def manual_config(request: Request, host: IloHost = Depends(get_host)):
+    snapshot = host.state.snapshot
     fans = [
         {
-            "id": fan["id"],
-            "name": fan["name"],
-            "verbose_name": fan["verbose-name"],
-            "speed": math.ceil((ilo_state["manual_speeds"].get(fan["name"]) / 255) * 100)
+            "id": fan.id,
+            "name": fan.name,
+            "verbose_name": fan.verbose_name,
+            "speed": math.ceil((snapshot.manual_speeds.get(fan.name, config.MANUAL_DEFAULT_SPEED) / 255) * 100),
+            "status": host.actuator.status(fan.id),
         }
-        for fan in config.FANS if fan["enabled"]
+        for fan in config.HARDWARE.current.enabled_fans
     ]
 
     return templates.TemplateResponse("partials/manual_config.html", {
         "request": request,
-        "current_mode": ilo_state["mode"],
+        "base": host.base,
+        "current_mode": snapshot.mode,
         "fans": fans
     })
 
 # Actuation endpoints
-@app.post("/mode", response_class=HTMLResponse)
-async def set_mode(request: Request, mode: str = Form(...)):
+@router.post("/mode", response_class=HTMLResponse)
+async def set_mode(request: Request, mode: str = Form(...), host: IloHost = Depends(get_host)):
     # Check if the mode is valid
-    if mode not in {"auto", "silent", "manual"}:
+    if mode not in {"auto", "silent", "manual", "curve"}:
         return HTMLResponse("Invalid mode", status_code=400)
 
-    await change_mode(mode)
+    await host.change_mode(mode)
 
     # Respond with the updated mode-panel partial
-    return templates.TemplateResponse("partials/mode.html", {
-        "request": request,
-        "current_mode": ilo_state["mode"],
-        "manual_speeds": ilo_state.get("manual_speeds", {}),
-        "last_update": ilo_state.get("last_updated", "--:--:--"),
-    })
+    return HTMLResponse(render_mode(host.state.snapshot, host.base)[0])
+
+@router.get("/history")
+def get_history(sensors: list[str] = Query(...), start: float | None = None, end: float | None = None,
+                resolution: str | None = None, host: IloHost = Depends(get_host)):
+    """ History of one or more sensors or fans, as UNIX timestamps and one list of values per sensor.
 
-@app.post("/fans", response_class=HTMLResponse)
-async def manual_fan(request: Request, fan_id: int = Form(...), value: int = Form(...)):
+    Defaults to the last hour. The resolution (raw, 1m, 1h) is picked automatically unless given,
+    and at most HISTORY_MAX_POINTS points are returned. Runs in the thread pool, so decoding a
+    long range never holds up the pollers, the watchdog or the push streams.
+    """
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - 3600
+    try:
+        return JSONResponse(host.history.query(sensors, start, end, resolution, config.HISTORY_MAX_POINTS))
+    except KeyError:
+        return JSONResponse({"error": f"Invalid resolution: {resolution}"}, status_code=400)
+
+@router.get("/events")
+async def events(request: Request, host: IloHost = Depends(get_host)):
+    host.wake()
+    return event_stream(request, host.broadcaster)
+
+@router.post("/fans", response_class=HTMLResponse)
+async def manual_fan(request: Request, fan_id: int = Form(...), value: int = Form(...), host: IloHost = Depends(get_host)):
 
     # Check if current mode is manual
-    if ilo_state["mode"] != "manual":
+    if host.state.snapshot.mode != "manual":
         return HTMLResponse("Cannot set fan speed when not in manual mode.", status_code=400)
     
     # Check if fan_id is valid and enabled
-    fan_config = next((f for f in config.FANS if f["id"] == fan_id and f["enabled"]), None)
-    if not fan_config:
+    fan_config = config.HARDWARE.current.fans_by_id.get(fan_id)
+    if not fan_config or not fan_config.enabled:
         return HTMLResponse("Invalid fan ID or disabled fan.", status_code=400)
     
     # Check if value is within the valid range
     if not (0 <= value <= 100):
         return HTMLResponse("Invalid speed value, must be between 0 and 100.", status_code=400)
 
-    fan_name = fan_config["name"]
-    logging.info(f"Manual speed set for '{fan_name}' to {value}%")
+    fan_name = fan_config.name
+    host.log.info(f"Manual speed set for '{fan_name}' to {value}%")
+
+    # Convert percentage and queue the lock command, without waiting for the iLO
+    status = host.set_manual_speed(fan_id, value)
+
+    return HTMLResponse(status or "")
+
+# JSON API for scripts and other services, serialized straight from the snapshot
+API_VERSION = 1
+API_EPOCH = int(time.time()) # Snapshot versions restart at 0 with the process, the epoch tells them apart
+
+class FanSpeeds(BaseModel):
+    speeds: dict[int, int] # Fan ID -> speed in % (0-100)
+
+class ModeChange(BaseModel):
+    mode: str
+
+@memoized("fans", "temperatures", "mode", "manual_speeds", "applied", "last_updated", "polled_at", "poll_interval")
+def render_state_json(snapshot: Snapshot) -> bytes:
+    """ Serialize a snapshot for the JSON API, once per snapshot. """
+    registry = config.HARDWARE.current
+    return json.dumps({
+        "api_version": API_VERSION,
+        "epoch": API_EPOCH,
+        "version": snapshot.version,
+        "mode": snapshot.mode,
+        "last_updated": snapshot.last_updated,
+        "polled_at": snapshot.polled_at,
+        "poll_interval": snapshot.poll_interval,
+        "fans": [
+            {"id": registry.fans_by_name[name].id if name in registry.fans_by_name else None, "name": name, "speed": speed,
+             "applied_pwm": snapshot.applied.get(name), "manual_pwm": snapshot.manual_speeds.get(name)}
+            for name, speed in snapshot.fans.items()
+        ],
+        "temperatures": [
+            {"name": name, "value": value,
+             "safe_max": registry.sensors_by_name[name].safe_max if name in registry.sensors_by_name else None}
+            for name, value in snapshot.temperatures.items()
+        ],
+    }, separators=(",", ":")).encode()
+
+def state_response(snapshot: Snapshot, request: Request | None = None) -> Response:
+    """ Serve a snapshot as JSON, answering 304 if the client already has it.
 
-    # Convert percentage, lock the fan to the specified speed and update the state
-    await set_manual_speed(fan_id, value)
+    Args:
+        snapshot (Snapshot): The snapshot to serve.
+        request (Request | None): The incoming request, to honor If-None-Match.
 
-    return HTMLResponse("")
+    Returns:
+        Response: The snapshot with its ETag, or an empty 304 response.
+    """
+    etag = f'"{API_EPOCH}-{snapshot.version}"'
+    if request is not None and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(render_state_json(snapshot), media_type="application/json", headers={"ETag": etag})
+
+@router.get(f"/api/v{API_VERSION}/state")
+async def api_state(request: Request, since: int | None = None, timeout: float = Query(30, ge=0, le=300),
+                    host: IloHost = Depends(get_host)):
+    """ Current snapshot of a host: fans, temperatures, mode, freshness and snapshot version.
+
+    With `since`, long-poll: wait up to `timeout` seconds for a snapshot newer than that version.
+    A `since` ahead of the current version comes from before a restart and is answered at once.
+    """
+    snapshot = host.state.snapshot
+    if since is not None and snapshot.version == since:
+        snapshot = await host.wait_for_change(since, timeout)
+    return state_response(snapshot, request)
+
+@router.put(f"/api/v{API_VERSION}/fans")
+async def api_fans(body: FanSpeeds, host: IloHost = Depends(get_host)):
+    """ Set the speed of several fans in manual mode at once.
+
+    Answers 202 with the status of each fan ("pending" or "applied") while commands are queued.
+    """
+    if host.state.snapshot.mode != "manual":
+        return JSONResponse({"error": "Cannot set fan speeds when not in manual mode."}, status_code=409)
+    statuses = host.set_manual_speeds(body.speeds)
+    if statuses is None:
+        return JSONResponse({"error": "Invalid fan ID or speed, speeds must be between 0 and 100."}, status_code=400)
+    return JSONResponse(
+        {"version": host.state.snapshot.version, "fans": statuses},
+        status_code=202 if "pending" in statuses.values() else 200,
+    )
+
+@router.put(f"/api/v{API_VERSION}/mode")
+async def api_mode(body: ModeChange, host: IloHost = Depends(get_host)):
+    """ Change the fan mode and return the resulting snapshot. """
+    if body.mode not in {"auto", "silent", "manual", "curve"}:
+        return JSONResponse({"error": f"Invalid mode: {body.mode}"}, status_code=400)
+    await host.change_mode(body.mode)
+    return state_response(host.state.snapshot)
+
+app.include_router(router, prefix="/hosts/{host_name}")
+app.include_router(router)
@@ -0,0 +1,73 @@
+from prometheus_client import Counter, Histogram, REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+# Latency buckets in seconds, from a warm SSH channel to a slow iLO TLS handshake
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_RENDER_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+POLL_SECONDS = Histogram("ilo_poll_seconds", "Duration of a Redfish thermal poll", ["host"], buckets=_LATENCY_BUCKETS)
+POLL_ERRORS = Counter("ilo_poll_errors_total", "Failed Redfish thermal polls", ["host", "kind"])
+SSH_CONNECT_SECONDS = Histogram("ilo_ssh_connect_seconds", "Duration of an SSH connection handshake", ["host"], buckets=_LATENCY_BUCKETS)
+SSH_EXEC_SECONDS = Histogram("ilo_ssh_exec_seconds", "Duration of an SSH command on a pooled connection", ["host"], buckets=_LATENCY_BUCKETS)
+SSH_ERRORS = Counter("ilo_ssh_errors_total", "Failed SSH connections and commands", ["host", "kind"])
+WATCHDOG_SECONDS = Histogram("ilo_watchdog_eval_seconds", "Duration of a thermal watchdog evaluation", ["host"], buckets=_RENDER_BUCKETS)
+WATCHDOG_REACTION_SECONDS = Histogram("ilo_watchdog_reaction_seconds", "Time from a flagged poll to fans back in auto mode", ["host"], buckets=_LATENCY_BUCKETS)
+WATCHDOG_TRIGGERS = Counter("ilo_watchdog_triggers_total", "Times the thermal watchdog forced auto mode", ["host"])
+RENDER_SECONDS = Histogram("ilo_render_seconds", "Duration of a partial render (cache misses only)", ["partial"], buckets=_RENDER_BUCKETS)
+
+class HostMetrics:
+    """ Metric children bound to one host, so the hot paths skip the label lookup.
+
+    Args:
+        host (str): The host name used as label.
+    """
+
+    def __init__(self, host: str):
+        self.poll_seconds = POLL_SECONDS.labels(host)
+        self.poll_errors = {kind: POLL_ERRORS.labels(host, kind) for kind in ("http", "status", "unexpected")}
+        self.ssh_connect_seconds = SSH_CONNECT_SECONDS.labels(host)
+        self.ssh_exec_seconds = SSH_EXEC_SECONDS.labels(host)
+        self.ssh_errors = {kind: SSH_ERRORS.labels(host, kind) for kind in ("connect", "exec")}
+        self.watchdog_seconds = WATCHDOG_SECONDS.labels(host)
+        self.watchdog_reaction_seconds = WATCHDOG_REACTION_SECONDS.labels(host)
+        self.watchdog_triggers = WATCHDOG_TRIGGERS.labels(host)
+
+class FleetCollector:
+    """ Expose the latest snapshot of every host as gauges, read at scrape time.
+
+    Args:
+        fleet: The Fleet whose hosts are exposed.
+    """
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+
+    def collect(self):
+        temperature = GaugeMetricFamily("ilo_temperature_celsius", "Latest temperature reading", labels=["host", "sensor"])
+        fan_speed = GaugeMetricFamily("ilo_fan_speed_percent", "Latest fan speed reading", labels=["host", "fan"])
+        fan_pwm = GaugeMetricFamily("ilo_fan_pwm_applied", "PWM locked on a fan, absent when unlocked", labels=["host", "fan"])
+        mode = GaugeMetricFamily("ilo_mode", "Current fan mode, 1 for the active mode", labels=["host", "mode"])
+        version = GaugeMetricFamily("ilo_state_version", "Version of the latest state snapshot", labels=["host"])
+        interval = GaugeMetricFamily("ilo_poll_interval_seconds", "Current adaptive poll interval", labels=["host"])
+
+        for host in self.fleet:
+            snapshot = host.state.snapshot
+            for name, value in snapshot.temperatures.items():
+                if value is not None:
+                    temperature.add_metric([host.name, name], value)
+            for name, value in snapshot.fans.items():
+                if value is not None:
+                    fan_speed.add_metric([host.name, name], value)
+            for name, pwm in snapshot.applied.items():
+                if pwm is not None:
+                    fan_pwm.add_metric([host.name, name], pwm)
+            mode.add_metric([host.name, snapshot.mode], 1)
+            version.add_metric([host.name], snapshot.version)
+            if snapshot.poll_interval is not None:
+                interval.add_metric([host.name], snapshot.poll_interval)
+
+        yield from (temperature, fan_speed, fan_pwm, mode, version, interval)
+
+def register_fleet(fleet):
+    """ Register the gauges of a fleet in the default registry. """
+    REGISTRY.register(FleetCollector(fleet))
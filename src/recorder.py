@@ -0,0 +1,131 @@
+import gzip, json, logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Iterable, Iterator, Mapping
+
+TRACE_VERSION = 1
+
+class TraceRecorder:
+    """ Stream the Redfish snapshots and fan actuations of a host to compressed trace files.
+
+    One gzip file of JSON lines per day. A header line lists the sensor and fan columns,
+    followed by compact records:
+        ["s", time, [temperatures...], [fan speeds...]]  a new Redfish snapshot, in header column order
+        ["a", time, fan ID, PWM or null]                  a fan command that succeeded, null to unlock
+        ["m", time, mode]                                 the fan mode changed
+        ["t", time]                                       a poll whose readings did not change (304 or identical body)
+
+    A new header is written whenever the columns change. The compressor is flushed every
+    `flush_interval` seconds, so little is lost on a crash while keeping the ratio high.
+
+    Args:
+        directory (Path): Folder of the trace files of this host.
+        retention_days (int): Days of trace files to keep, older files are deleted.
+        flush_interval (float): Seconds between flushes to disk.
+    """
+
+    def __init__(self, directory: Path, retention_days: int = 90, flush_interval: float = 30):
+        self.directory = Path(directory)
+        self.retention_days = retention_days
+        self.flush_interval = flush_interval
+        self._file = None
+        self._day = None
+        self._header = None # Header of the current columns, and whether the current file has it yet
+        self._header_columns = None
+        self._header_written = False
+        self._last_snapshot = None # Readings of the last snapshot, written again when a tick starts a new file
+        self._flushed = 0.0
+
+    def _write(self, now: float, record):
+        day = datetime.fromtimestamp(now).date()
+        if day != self._day:
+            self._rotate(day)
+        if record[0] == "s" and not self._header_written:
+            # Snapshots are always preceded by the header of their columns in the same file
+            self._file.write(json.dumps(self._header, separators=(",", ":")) + "\n")
+            self._header_written = True
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        if now - self._flushed >= self.flush_interval:
+            self._file.flush()
+            self._flushed = now
+
+    def _rotate(self, day):
+        """ Switch to the file of a new day and delete the files past the retention. """
+        self.close()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._file = gzip.open(self.directory / f"{day.isoformat()}.trace.gz", "at", encoding="utf-8")
+        self._day = day
+        self._header_written = False
+
+        oldest = (day - timedelta(days=self.retention_days)).isoformat()
+        for path in self.directory.glob("*.trace.gz"):
+            if path.name[:10] < oldest:
+                path.unlink(missing_ok=True)
+
+    def snapshot(self, now: float, temperatures: Mapping, fans: Mapping):
+        """ Record the readings of a new Redfish snapshot. """
+        try:
+            columns = (tuple(temperatures), tuple(fans))
+            if columns != self._header_columns:
+                self._header = {"trace": TRACE_VERSION, "sensors": columns[0], "fans": columns[1]}
+                self._header_columns = columns
+                self._header_written = False
+            self._last_snapshot = (list(temperatures.values()), list(fans.values()))
+            self._write(now, ["s", round(now, 2), *self._last_snapshot])
+        except Exception as e:
+            logging.exception(f"Failed to record trace snapshot: {e}")
+
+    def tick(self, now: float):
+        """ Record a poll that returned the same readings as the last snapshot, so stable periods keep their duration. """
+        if self._last_snapshot is None:
+            return
+        try:
+            if datetime.fromtimestamp(now).date() != self._day or not self._header_written:
+                # Every file stands on its own, the first record of the day repeats the readings
+                self._write(now, ["s", round(now, 2), *self._last_snapshot])
+            else:
+                self._write(now, ["t", round(now, 2)])
+        except Exception as e:
+            logging.exception(f"Failed to record trace tick: {e}")
+
+    def actuation(self, now: float, fan_id: int, pwm: int | None):
+        """ Record a fan command that succeeded. """
+        try:
+            self._write(now, ["a", round(now, 2), fan_id, pwm])
+        except Exception as e:
+            logging.exception(f"Failed to record trace actuation: {e}")
+
+    def mode(self, now: float, mode: str):
+        """ Record a change of fan mode. """
+        try:
+            self._write(now, ["m", round(now, 2), mode])
+        except Exception as e:
+            logging.exception(f"Failed to record trace mode: {e}")
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def read_trace(paths: Iterable[Path]) -> Iterator[tuple]:
+    """ Stream the records of trace files, in file order.
+
+    Args:
+        paths (Iterable[Path]): Trace files, e.g. sorted(directory.glob("*.trace.gz")).
+
+    Yields:
+        tuple: ("h", sensor names, fan names) for every header, then records as written,
+        ("s", time, temperatures, fan speeds), ("a", time, fan ID, PWM), ("m", time, mode) or ("t", time).
+    """
+    for path in paths:
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    if isinstance(record, dict):
+                        yield ("h", record["sensors"], record["fans"])
+                    else:
+                        yield tuple(record)
+        except (OSError, EOFError, ValueError) as e:
+            # A file cut short by a crash still yields everything before the damage
+            logging.warning(f"Stopped reading {path}: {e}")
@@ -0,0 +1,198 @@
+import asyncio, json, logging, signal
+from array import array
+from pathlib import Path
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+class Fan:
+    """ A fan of the server, addressed by its ID in SSH commands and by its name in Redfish. """
+    __slots__ = ("id", "name", "verbose_name", "enabled")
+
+    def __init__(self, id: int, name: str, verbose_name: str, enabled: bool):
+        self.id = id
+        self.name = name
+        self.verbose_name = verbose_name
+        self.enabled = enabled
+
+class Sensor:
+    """ A temperature sensor, with its safe max and the aggregation group it is displayed in, if any. """
+    __slots__ = ("id", "name", "verbose_name", "enabled", "safe_max", "group")
+
+    def __init__(self, id: int, name: str, verbose_name: str, enabled: bool, safe_max: float, group: str | None):
+        self.id = id
+        self.name = name
+        self.verbose_name = verbose_name
+        self.enabled = enabled
+        self.safe_max = safe_max
+        self.group = group
+
+class Group:
+    """ Sensors displayed as a single aggregated reading, e.g. every DIMM as "Memory". """
+    __slots__ = ("name", "verbose_name", "safe_max", "aggregate", "sensors")
+
+    def __init__(self, name: str, verbose_name: str, safe_max: float | None, aggregate: str, sensors: tuple):
+        self.name = name
+        self.verbose_name = verbose_name
+        self.safe_max = safe_max
+        self.aggregate = aggregate
+        self.sensors = sensors
+
+    def value(self, temperatures) -> float | None:
+        """ Aggregate the readings of the group, None if none of its sensors has a reading. """
+        values = [temperatures[name] for name in self.sensors if temperatures.get(name) is not None]
+        if not values:
+            return None
+        if self.aggregate == "max":
+            return max(values)
+        return round(sum(values) / len(values), 1)
+
+class Registry:
+    """ Compiled, read-only hardware definition: fans, sensors and aggregation groups.
+
+    Everything the hot paths need is computed once here: indexes by ID and name, the
+    enabled fans and sensors, the threshold arrays of the enabled sensors and the
+    display order of the temperature readings. Replace the registry to change any of it.
+
+    Args:
+        data (dict): The hardware definition, see hardware.json.
+
+    Raises:
+        ValueError: If the definition is invalid.
+    """
+    __slots__ = ("fans", "fans_by_id", "fans_by_name", "enabled_fans", "sensors", "sensors_by_name",
+                 "enabled_sensors", "groups", "threshold_names", "threshold_verbose", "threshold_values", "display")
+
+    AGGREGATES = {"mean", "max"}
+
+    def __init__(self, data: dict):
+        try:
+            self.fans = tuple(
+                Fan(int(f["id"]), f["name"], f.get("verbose-name", f["name"]), bool(f.get("enabled", True)))
+                for f in data["fans"]
+            )
+            self.sensors = tuple(
+                Sensor(int(s["id"]), s["name"], s.get("verbose-name", s["name"]), bool(s.get("enabled", True)),
+                       s["safe-max"], s.get("group"))
+                for s in data["sensors"]
+            )
+            declared = {g["name"]: g for g in data.get("groups", [])}
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Invalid hardware definition: {e!r}") from e
+
+        self.fans_by_id = {f.id: f for f in self.fans}
+        self.fans_by_name = {f.name: f for f in self.fans}
+        self.sensors_by_name = {s.name: s for s in self.sensors}
+        if len(self.fans_by_id) != len(self.fans) or len(self.fans_by_name) != len(self.fans):
+            raise ValueError("Invalid hardware definition: duplicate fan ID or name")
+        if len(self.sensors_by_name) != len(self.sensors):
+            raise ValueError("Invalid hardware definition: duplicate sensor name")
+
+        self.enabled_fans = tuple(f for f in self.fans if f.enabled)
+        self.enabled_sensors = tuple(s for s in self.sensors if s.enabled)
+
+        # Every value is checked before anything is computed from it
+        for s in self.sensors:
+            if not _is_number(s.safe_max):
+                raise ValueError(f"Invalid hardware definition: safe-max of sensor '{s.name}' is not a number")
+            if s.group is not None and s.group not in declared:
+                raise ValueError(f"Invalid hardware definition: sensor '{s.name}' is in undeclared group '{s.group}'")
+        for name, g in declared.items():
+            if g.get("aggregate", "mean") not in self.AGGREGATES:
+                raise ValueError(f"Invalid hardware definition: unknown aggregate '{g['aggregate']}' for group '{name}'")
+            if "safe-max" in g and not _is_number(g["safe-max"]):
+                raise ValueError(f"Invalid hardware definition: safe-max of group '{name}' is not a number")
+
+        # Aggregation groups, made of their enabled sensors
+        self.groups = {}
+        for name, g in declared.items():
+            members = tuple(s.name for s in self.enabled_sensors if s.group == name)
+            safe_max = g.get("safe-max", min((self.sensors_by_name[m].safe_max for m in members), default=None))
+            self.groups[name] = Group(name, g.get("verbose-name", name), safe_max, g.get("aggregate", "mean"), members)
+
+        # Thresholds of the enabled sensors, in the same order in every array
+        self.threshold_names = tuple(s.name for s in self.enabled_sensors)
+        self.threshold_verbose = tuple(s.verbose_name for s in self.enabled_sensors)
+        self.threshold_values = array("d", (s.safe_max for s in self.enabled_sensors))
+
+        # Temperature readings as displayed: ungrouped sensors and non-empty groups, by verbose name
+        items = [s for s in self.enabled_sensors if s.group is None] + [g for g in self.groups.values() if g.sensors]
+        self.display = tuple(sorted(items, key=lambda item: item.verbose_name))
+
+    @property
+    def current(self) -> "Registry":
+        """ The registry itself, so a fixed registry can be used wherever a HardwareRegistry is expected. """
+        return self
+
+    @classmethod
+    def load(cls, path: Path) -> "Registry":
+        """ Compile the hardware definition stored in a JSON file. """
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+class HardwareRegistry:
+    """ Holder of the current registry, reloaded from its file without restarting anything.
+
+    Readers take `current` once per operation. A reload compiles the new file completely
+    before swapping the reference, so readers see either the old or the new registry,
+    never a mix, and an invalid file keeps the old registry in place.
+
+    Args:
+        path (Path): The JSON hardware definition.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.current = Registry.load(self.path)
+        self.listeners = [] # Called with the new registry after every reload
+        self._mtime = self._stat()
+
+    def _stat(self) -> int | None:
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self) -> bool:
+        """ Compile the file again and swap it in.
+
+        Returns:
+            bool: True if the new registry is in place, False if the file is invalid.
+        """
+        self._mtime = self._stat()
+        try:
+            registry = Registry.load(self.path)
+        except (OSError, ValueError) as e:
+            logging.error(f"Keeping the current hardware definition, failed to reload {self.path}: {e}")
+            return False
+
+        self.current = registry
+        logging.info(f"Reloaded hardware definition from {self.path}")
+        for listener in self.listeners:
+            try:
+                listener(registry)
+            except Exception as e:
+                logging.exception(f"Hardware reload listener failed: {e}")
+        return True
+
+    async def watch(self, interval: float):
+        """ Reload whenever the file changes, checked every `interval` seconds, or on SIGHUP. """
+        loop = asyncio.get_running_loop()
+        try:
+            loop.add_signal_handler(signal.SIGHUP, self.reload)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass # No SIGHUP on this platform, or not in the main thread
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                if self._stat() != self._mtime:
+                    try:
+                        self.reload()
+                    except Exception as e:
+                        # An unexpected error must not end the watch, the next change is retried
+                        logging.exception(f"Failed to reload {self.path}: {e}")
+        finally:
+            try:
+                loop.remove_signal_handler(signal.SIGHUP)
+            except (AttributeError, NotImplementedError, RuntimeError):
+                pass
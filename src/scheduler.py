@@ -0,0 +1,79 @@
+import random
+from typing import Mapping
+from watchdog import RateWindow
+
+class PollScheduler:
+    """ Pick the delay before the next Redfish poll from the latest readings.
+
+    Polls fast while a sensor is close to its safe max or changing quickly, slow down
+    when the readings are stable, the iLO is in control and nobody is watching, and
+    back off exponentially with jitter while the iLO returns errors. The backoff never
+    exceeds the default interval while the fans are locked, the watchdog only runs on
+    successful polls.
+
+    The rate of change is measured over `rate_window` seconds like the watchdog's rate of rise,
+    so a single whole-degree step between two polls does not count as changing quickly.
+
+    Args:
+        hardware (HardwareRegistry | Registry): Source of the enabled sensors and their safe max.
+        base (float): Default interval in seconds.
+        fast (float): Interval while a sensor is hot or changing quickly.
+        idle (float): Interval while stable, in auto mode and without viewers.
+        backoff_max (float): Upper bound of the interval after consecutive errors.
+        hot_margin (float): Distance to the safe max (°C) under which a sensor is hot.
+        fast_rate (float): Rate of change (°C/s) over which a sensor is changing quickly.
+        rate_window (float): Seconds the rate of change is measured over.
+    """
+
+    def __init__(self, hardware, base: float, fast: float, idle: float, backoff_max: float,
+                 hot_margin: float, fast_rate: float, rate_window: float = 10):
+        self.hardware = hardware
+        self.base = base
+        self.fast = fast
+        self.idle = idle
+        self.backoff_max = backoff_max
+        self.hot_margin = hot_margin
+        self.fast_rate = fast_rate
+        self._rates = RateWindow(rate_window)
+        self._backoff = 0.0
+
+    def _urgent(self, temperatures: Mapping, now: float) -> bool:
+        """ Whether any sensor is close to its safe max or changing quickly. """
+        registry = self.hardware.current
+        urgent = False
+        for name, safe_max in zip(registry.threshold_names, registry.threshold_values):
+            value = temperatures.get(name)
+            if value is None:
+                continue
+            rate = self._rates.update(name, value, now)
+            if value >= safe_max - self.hot_margin:
+                urgent = True
+            elif rate is not None and abs(rate) >= self.fast_rate:
+                urgent = True
+        return urgent
+
+    def next_interval(self, temperatures: Mapping, now: float, ok: bool, can_idle: bool, locked: bool = False) -> float:
+        """ Compute the delay before the next poll.
+
+        Args:
+            temperatures (Mapping): Map of sensor name to the latest reading.
+            now (float): Time of the readings in seconds.
+            ok (bool): Whether the last poll succeeded.
+            can_idle (bool): Whether slowing down is allowed, i.e. the iLO controls the fans and nobody is watching.
+            locked (bool): Whether the fans are locked by the dashboard, i.e. in manual, silent or curve mode.
+
+        Returns:
+            float: Seconds to wait before the next poll.
+        """
+        if not ok:
+            # Exponential backoff with jitter, so a fleet of failing hosts does not retry in lockstep,
+            # capped at the default interval while the fans are locked so the watchdog is never blind for long
+            self._backoff = min(max(self._backoff * 2, self.base), self.base if locked else self.backoff_max)
+            return round(random.uniform(self._backoff / 2, self._backoff), 2)
+        self._backoff = 0.0
+
+        if self._urgent(temperatures, now):
+            return self.fast
+        if can_idle:
+            return self.idle
+        return self.base
@@ -0,0 +1,170 @@
+import asyncio, logging, time
+import asyncssh
+
+class _PooledConnection:
+    """ A single long-lived SSH connection and the channels currently open on it. """
+
+    def __init__(self, conn: asyncssh.SSHClientConnection, max_channels: int):
+        self.conn = conn
+        self.channels = asyncio.Semaphore(max_channels)
+        self.in_use = 0
+        self.closed = False
+
+class SSHConnectionPool:
+    """ Small bounded pool of persistent SSH connections to the iLO.
+
+    Connections are opened lazily, kept alive with SSH keepalives and reused for every
+    command, so actuating a fan only costs opening a channel instead of a full handshake.
+    A dropped connection is discarded and re-established with exponential backoff.
+
+    Args:
+        host (str): The iLO hostname or IP address.
+        username (str): The iLO user.
+        password (str): The iLO password.
+        size (int): Maximum number of concurrent SSH connections.
+        max_channels (int): Maximum number of channels open at once on each connection.
+        keepalive_interval (float): Seconds between SSH keepalive requests.
+        backoff_min (float): Initial reconnect delay in seconds.
+        backoff_max (float): Upper bound of the reconnect delay in seconds.
+        metrics (HostMetrics | None): Metrics of the host, to record connect and exec latency.
+        port (int): The SSH port of the iLO.
+    """
+
+    def __init__(self, host: str, username: str, password: str, size: int = 2, max_channels: int = 1,
+                 keepalive_interval: float = 15, backoff_min: float = 0.5, backoff_max: float = 30, metrics=None,
+                 port: int = 22):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.max_channels = max_channels
+        self.keepalive_interval = keepalive_interval
+        self.backoff_min = backoff_min
+        self.backoff_max = backoff_max
+        self.metrics = metrics
+
+        self._connections: list[_PooledConnection] = []
+        self._slots = asyncio.Semaphore(size * max_channels)
+        self._lock = asyncio.Lock()
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+        self._closing = False
+
+    async def _connect(self) -> _PooledConnection:
+        """ Open a new SSH connection, honoring the current reconnect backoff. """
+
+        # Fail fast while in the backoff window left by a previous failed attempt
+        delay = self._next_attempt - time.monotonic()
+        if delay > 0:
+            raise ConnectionError(f"SSH reconnect to {self.host} backing off, next attempt in {delay:.1f}s")
+
+        started = time.perf_counter()
+        try:
+            conn = await asyncssh.connect(
+                self.host,
+                self.port,
+                username=self.username,
+                password=self.password,
+                known_hosts=None,                           # skip host verification
+                kex_algs=["diffie-hellman-group1-sha1"],    # required for older iLOs
+                server_host_key_algs=["ssh-rsa"],           # also for compatibility
+                keepalive_interval=self.keepalive_interval,
+                keepalive_count_max=3,
+            )
+        except Exception:
+            if self.metrics is not None:
+                self.metrics.ssh_errors["connect"].inc()
+
+            # Double the delay before the next attempt, up to the configured maximum
+            self._backoff = min(max(self._backoff * 2, self.backoff_min), self.backoff_max)
+            self._next_attempt = time.monotonic() + self._backoff
+            raise
+
+        if self.metrics is not None:
+            self.metrics.ssh_connect_seconds.observe(time.perf_counter() - started)
+        self._backoff = 0.0
+        self._next_attempt = 0.0
+        pooled = _PooledConnection(conn, self.max_channels)
+        asyncio.create_task(self._watch(pooled))
+        logging.info(f"SSH connection opened to {self.host} ({len(self._connections) + 1}/{self.size})")
+        return pooled
+
+    async def _watch(self, pooled: _PooledConnection):
+        """ Drop a connection from the pool as soon as the iLO closes it. """
+        try:
+            await pooled.conn.wait_closed()
+        finally:
+            self._discard(pooled)
+
+    def _discard(self, pooled: _PooledConnection):
+        """ Remove a connection from the pool and close it. """
+        if pooled.closed:
+            return
+        pooled.closed = True
+        if pooled in self._connections:
+            self._connections.remove(pooled)
+        pooled.conn.close()
+        if not self._closing:
+            logging.warning(f"SSH connection to {self.host} dropped, will reconnect on next command")
+
+    async def _acquire(self) -> _PooledConnection:
+        """ Pick the least busy live connection, opening a new one if the pool has room. """
+        async with self._lock:
+            live = [p for p in self._connections if not p.closed]
+            idle = [p for p in live if p.in_use == 0]
+
+            if not idle and len(live) < self.size:
+                pooled = await self._connect()
+                self._connections.append(pooled)
+            else:
+                pooled = min(live, key=lambda p: p.in_use)
+
+            pooled.in_use += 1
+            return pooled
+
+    async def run(self, command: str, retries: int = 1) -> str:
+        """ Run a command on a pooled connection.
+
+        Args:
+            command (str): The command to execute on the iLO server.
+            retries (int): How many times to retry on a fresh connection if the current one is broken.
+
+        Returns:
+            str: The output of the command.
+
+        Raises:
+            asyncssh.Error, OSError: If the command cannot be executed.
+        """
+        async with self._slots:
+            for attempt in range(retries + 1):
+                pooled = await self._acquire()
+                try:
+                    async with pooled.channels:
+                        started = time.perf_counter()
+                        result = await pooled.conn.run(command, check=True)
+                    if self.metrics is not None:
+                        self.metrics.ssh_exec_seconds.observe(time.perf_counter() - started)
+                    return result.stdout
+                except asyncssh.ProcessError:
+                    # The command itself failed, the connection is still healthy
+                    if self.metrics is not None:
+                        self.metrics.ssh_errors["exec"].inc()
+                    raise
+                except (asyncssh.Error, OSError) as e:
+                    if self.metrics is not None:
+                        self.metrics.ssh_errors["exec"].inc()
+                    # Broken connection, drop it and retry on a new one
+                    self._discard(pooled)
+                    if attempt == retries:
+                        raise
+                    logging.warning(f"SSH command '{command}' failed on a stale connection ({e}), retrying")
+                finally:
+                    pooled.in_use -= 1
+
+    async def close(self):
+        """ Close every pooled connection. """
+        self._closing = True
+        for pooled in list(self._connections):
+            self._discard(pooled)
+        self._connections.clear()
@@ -0,0 +1,99 @@
+import dataclasses, functools
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Mapping
+
+def _freeze(value):
+    """ Wrap dictionaries in a read-only view so snapshots cannot be mutated in place. """
+    return MappingProxyType(dict(value)) if isinstance(value, Mapping) else value
+
+@dataclass(frozen=True)
+class Snapshot:
+    """ Immutable view of the iLO state at a given version.
+
+    Every change produces a new snapshot with a higher version. Values derived from a
+    snapshot (readings lists, rendered partials) are memoized on it, see `memoized`.
+    """
+    version: int = 0
+    fans: Mapping = field(default_factory=dict)
+    temperatures: Mapping = field(default_factory=dict)
+    last_updated: str | None = None
+    polled_at: float | None = None # UNIX time of the last successful poll
+    manual_speeds: Mapping = field(default_factory=dict)
+    applied: Mapping = field(default_factory=dict) # PWM currently locked on each fan, None when unlocked
+    mode: str = "auto" # auto, manual, silent, curve
+    poll_interval: float | None = None # Seconds until the next poll, picked by the poll scheduler
+    _memo: dict = field(default_factory=dict, compare=False, repr=False)
+
+    def __post_init__(self):
+        for f in ("fans", "temperatures", "manual_speeds", "applied"):
+            object.__setattr__(self, f, _freeze(getattr(self, f)))
+
+class StateStore:
+    """ Holder of the current snapshot.
+
+    Args:
+        **initial: Initial snapshot fields.
+    """
+
+    def __init__(self, **initial):
+        self._snapshot = Snapshot(**initial)
+
+    @property
+    def snapshot(self) -> Snapshot:
+        """ The current snapshot. """
+        return self._snapshot
+
+    def update(self, **changes) -> Snapshot:
+        """ Replace the current snapshot with a new version carrying the given changes.
+
+        Changes equal to the current values are ignored, and memoized values whose
+        dependencies did not change are carried over to the new snapshot.
+
+        Args:
+            **changes: Snapshot fields to update.
+
+        Returns:
+            Snapshot: The new current snapshot, or the unchanged one if nothing changed.
+        """
+        old = self._snapshot
+        changes = {k: v for k, v in changes.items() if getattr(old, k) != v}
+        if not changes:
+            return old
+
+        new = dataclasses.replace(old, version=old.version + 1, _memo={}, **changes)
+        for key, (depends, value) in old._memo.items():
+            if not any(f in changes for f in depends):
+                new._memo[key] = (depends, value)
+
+        self._snapshot = new
+        return new
+
+    def invalidate(self) -> Snapshot:
+        """ Replace the current snapshot with a new version without any memoized value.
+
+        Used when something the memoized values depend on lives outside the snapshot,
+        e.g. after the hardware definition was reloaded.
+
+        Returns:
+            Snapshot: The new current snapshot.
+        """
+        self._snapshot = dataclasses.replace(self._snapshot, version=self._snapshot.version + 1, _memo={})
+        return self._snapshot
+
+def memoized(*depends: str):
+    """ Memoize a function of a snapshot on the snapshot itself.
+
+    Args:
+        *depends (str): Snapshot fields the result depends on. The cached value survives
+            new versions as long as none of these fields change.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(snapshot: Snapshot, *args):
+            key = (func.__qualname__, *args)
+            if key not in snapshot._memo:
+                snapshot._memo[key] = (depends, func(snapshot, *args))
+            return snapshot._memo[key][1]
+        return wrapper
+    return decorator
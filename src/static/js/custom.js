@@ -1,4 +1,4 @@
-document.body.addEventListener('htmx:afterSwap', function(evt) {
+function toggleManualConfig() {
     const manualButton = document.querySelector('button[hx-vals*=manual]');
     const configContainer = document.getElementById('manual-config-container');
 
@@ -6,4 +6,24 @@ document.body.addEventListener('htmx:afterSwap', function(evt) {
         const isManualActive = manualButton.classList.contains('btn-green-active');
         configContainer.classList.toggle('d-none', !isManualActive);
     }
-});
\ No newline at end of file
+}
+
+document.body.addEventListener('htmx:afterSwap', toggleManualConfig);
+
+// Live updates pushed by the server, one connection per tab
+const stateStream = new EventSource(document.body.dataset.events);
+
+// Bind every element naming an event, including those swapped in later such as the fan statuses
+function bindStateEvents(root) {
+    root.querySelectorAll('[data-sse-event]:not([data-sse-bound])').forEach(function(target) {
+        target.dataset.sseBound = 'true';
+        stateStream.addEventListener(target.dataset.sseEvent, function(evt) {
+            target.innerHTML = evt.data;
+            htmx.process(target);
+            toggleManualConfig();
+        });
+    });
+}
+
+bindStateEvents(document);
+document.body.addEventListener('htmx:afterSwap', function() { bindStateEvents(document); });
@@ -0,0 +1,95 @@
+from collections import deque
+from typing import Mapping
+
+class RateWindow:
+    """ Rate of change of each sensor, measured over a time window rather than between two readings.
+
+    iLO readings are whole degrees, so a steady climb reads 70, 70, 71, 71, 72... and the
+    reading-to-reading rate alternates between zero and a spike. The rate is measured against
+    the newest reading at least `window` seconds old instead.
+
+    Args:
+        window (float): Minimum age in seconds of the reference reading.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._readings: dict[str, deque] = {}
+
+    def update(self, name: str, value: float, now: float) -> float | None:
+        """ Add a reading and return the rate of change of the sensor.
+
+        Args:
+            name (str): The sensor name.
+            value (float): The reading.
+            now (float): Time of the reading in seconds.
+
+        Returns:
+            float | None: Rate in units per second, None until the readings span the window.
+        """
+        readings = self._readings.get(name)
+        if readings is None:
+            readings = self._readings[name] = deque()
+        readings.append((now, value))
+        while len(readings) > 2 and readings[1][0] <= now - self.window:
+            readings.popleft()
+        since, reference = readings[0]
+        return (value - reference) / (now - since) if now - since >= self.window else None
+
+class ThermalWatchdog:
+    """ Detect temperatures that exceed, or are about to exceed, their safe max.
+
+    Each evaluation reads the threshold arrays precomputed by the current hardware
+    registry, and flags a sensor if its reading reached the safe max, or if its rate of
+    rise projected over the horizon would reach it for `rise_debounce` consecutive evaluations.
+
+    The rate of rise is measured over the last `rise_horizon / 2` seconds, see RateWindow.
+
+    Args:
+        hardware (HardwareRegistry | Registry): Source of the enabled sensors and their safe max.
+        rise_horizon (float): Seconds ahead the current rate of rise is projected.
+        rise_debounce (int): Consecutive evaluations a projected breach must persist before it is flagged.
+    """
+
+    def __init__(self, hardware, rise_horizon: float = 10, rise_debounce: int = 2):
+        self.hardware = hardware
+        self.rise_horizon = rise_horizon
+        self.rise_debounce = rise_debounce
+        self.rise_window = rise_horizon / 2 # Seconds the rate of rise is measured over
+        self._rates = RateWindow(self.rise_window)
+        self._rising: dict[str, int] = {}
+
+    def evaluate(self, temperatures: Mapping, now: float) -> list:
+        """ Check a set of readings against the threshold index.
+
+        Args:
+            temperatures (Mapping): Map of sensor name to reading in °C.
+            now (float): Time of the readings in seconds, used for the rate of rise.
+
+        Returns:
+            list: (verbose name, value, safe max, reason) tuples of the flagged sensors, empty if all is fine.
+        """
+        registry = self.hardware.current
+        flagged = []
+        for name, verbose_name, safe_max in zip(registry.threshold_names, registry.threshold_verbose, registry.threshold_values):
+            value = temperatures.get(name)
+            if value is None:
+                continue
+
+            # Rate of rise since the newest reading at least rise_window seconds old
+            rate = self._rates.update(name, value, now)
+
+            if value >= safe_max:
+                flagged.append((verbose_name, value, safe_max, "exceeds safe-max"))
+                continue
+            if rate is None:
+                # Not enough history yet to measure the rate, keep the debounce count as is
+                continue
+
+            if rate > 0 and value + rate * self.rise_horizon >= safe_max:
+                self._rising[name] = self._rising.get(name, 0) + 1
+                if self._rising[name] >= self.rise_debounce:
+                    flagged.append((verbose_name, value, safe_max, f"rising {rate:.2f}°C/s"))
+            else:
+                self._rising.pop(name, None)
+        return flagged
@@ -0,0 +1,10 @@
+import os, sys
+from pathlib import Path
+
+# The application modules are flat in src/, imported the same way as by uvicorn
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+# config.py reads the iLO credentials from the environment, the tests never reach an iLO
+os.environ.setdefault("ILO_HOST", "ilo.invalid")
+os.environ.setdefault("ILO_USER", "test")
+os.environ.setdefault("ILO_PASS", "test")
@@ -0,0 +1,119 @@
+import asyncio
+from actuation import ActuationQueue
+
+class FakeFans:
+    """ Applies PWMs after a delay, optionally failing, and records every write. """
+
+    def __init__(self, delay: float = 0.01, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.pwms = {}
+        self.writes = []
+
+    async def apply(self, targets: dict) -> dict:
+        await asyncio.sleep(self.delay)
+        self.writes.append(dict(targets))
+        if self.fail:
+            return {fan_id: False for fan_id in targets}
+        self.pwms.update(targets)
+        return {fan_id: True for fan_id in targets}
+
+def queue(fans: FakeFans, allowed=lambda: True) -> ActuationQueue:
+    return ActuationQueue(fans.apply, applied=fans.pwms.get, allowed=allowed)
+
+def test_only_the_latest_value_is_applied():
+    async def scenario():
+        fans = FakeFans()
+        q = queue(fans)
+        assert q.submit(0, 10) == "pending"
+        await asyncio.sleep(0) # The worker picks up 10, the next values wait for it
+        assert [q.submit(0, pwm) for pwm in (20, 30, 40)] == ["pending"] * 3
+        while q.status(0) == "pending":
+            await asyncio.sleep(0.005)
+        return fans
+
+    fans = asyncio.run(scenario())
+    assert fans.writes == [{0: 10}, {0: 40}]
+    assert fans.pwms == {0: 40}
+
+def test_value_already_applied_is_skipped():
+    async def scenario():
+        fans = FakeFans()
+        fans.pwms[0] = 50
+        return queue(fans).submit(0, 50), fans
+
+    status, fans = asyncio.run(scenario())
+    assert status == "applied" and fans.writes == []
+
+def test_queued_values_are_dropped_when_not_allowed():
+    async def scenario():
+        fans = FakeFans()
+        allowed = [True]
+        q = queue(fans, allowed=lambda: allowed[0])
+        q.submit(0, 10)
+        await asyncio.sleep(0)
+        q.submit(0, 20)
+        allowed[0] = False # e.g. the mode changed while the first write was in flight
+        while q.status(0) == "pending":
+            await asyncio.sleep(0.005)
+        return fans
+
+    assert asyncio.run(scenario()).writes == [{0: 10}]
+
+def test_failed_value_is_retried_then_given_up():
+    async def scenario():
+        fans = FakeFans(delay=0, fail=True)
+        done = []
+        q = ActuationQueue(fans.apply, applied=fans.pwms.get, allowed=lambda: True, retries=2, on_done=done.append)
+        q.submit(0, 10)
+        while q.status(0) == "pending":
+            await asyncio.sleep(0.01)
+        return fans, q.status(0), done
+
+    fans, status, done = asyncio.run(scenario())
+    assert fans.writes == [{0: 10}, {0: 10}]
+    assert status == "failed" and done == [0]
+
+def test_done_callback_reports_applied_values():
+    async def scenario():
+        fans = FakeFans()
+        statuses = []
+        q = ActuationQueue(fans.apply, applied=fans.pwms.get, allowed=lambda: True,
+                           on_done=lambda fan_id: statuses.append(q.status(fan_id)))
+        q.submit(0, 10)
+        while q.status(0) == "pending":
+            await asyncio.sleep(0.005)
+        return statuses
+
+    assert asyncio.run(scenario()) == ["applied"]
+
+def test_cancel_stops_every_worker():
+    async def scenario():
+        fans = FakeFans(delay=0.05)
+        q = queue(fans)
+        q.submit(0, 10)
+        await asyncio.sleep(0) # Fan 0 is being written, fan 1 never started
+        q.submit(1, 10)
+        await q.cancel()
+        # Nothing is left behind, a new value starts a new worker
+        assert q.status(0) == q.status(1) == "applied"
+        q.submit(1, 20)
+        while q.status(1) == "pending":
+            await asyncio.sleep(0.005)
+        return fans
+
+    assert asyncio.run(scenario()).pwms == {1: 20}
+
+def test_cancel_only_the_given_fans():
+    async def scenario():
+        fans = FakeFans()
+        q = queue(fans)
+        q.submit(0, 10)
+        q.submit(1, 10)
+        await q.cancel([1])
+        assert q.status(1) == "applied"
+        while q.status(0) == "pending":
+            await asyncio.sleep(0.005)
+        return fans
+
+    assert asyncio.run(scenario()).pwms == {0: 10}
@@ -0,0 +1,38 @@
+from controller import CurveController, FanCurve
+
+CURVES = {"02-CPU 1": [(40, 13), (55, 30), (70, 100), (80, 255)]}
+
+def controller(**kwargs) -> CurveController:
+    options = {"hysteresis": 2, "max_step_up": 64, "max_step_down": 8, "deadband": 4, **kwargs}
+    return CurveController(CURVES, {0: ["02-CPU 1"], 1: ["02-CPU 1", "Unknown"]}, **options)
+
+def test_curve_interpolates_and_clamps():
+    curve = FanCurve(CURVES["02-CPU 1"])
+    assert curve.pwm_for(20) == 13
+    assert curve.pwm_for(62.5) == 65
+    assert curve.pwm_for(90) == 255
+
+def test_first_evaluation_targets_every_unlocked_fan():
+    assert controller().evaluate({"02-CPU 1": 70}, {}) == {0: 100, 1: 100}
+
+def test_deadband_skips_small_changes():
+    c = controller()
+    c.evaluate({"02-CPU 1": 70}, {})
+    assert c.evaluate({"02-CPU 1": 70.2}, {0: 100, 1: 100}) == {}
+
+def test_steps_are_rate_limited():
+    c = controller()
+    c.evaluate({"02-CPU 1": 55}, {})
+    assert c.evaluate({"02-CPU 1": 80}, {0: 30, 1: 30}) == {0: 94, 1: 94}
+    c = controller()
+    c.evaluate({"02-CPU 1": 80}, {})
+    assert c.evaluate({"02-CPU 1": 40}, {0: 255, 1: 255}) == {0: 247, 1: 247}
+
+def test_hysteresis_ignores_small_drops():
+    c = controller(max_step_down=255)
+    c.evaluate({"02-CPU 1": 70}, {})
+    assert c.evaluate({"02-CPU 1": 68.5}, {0: 100, 1: 100}) == {}
+    assert c.evaluate({"02-CPU 1": 65}, {0: 100, 1: 100}) == {0: 77, 1: 77}
+
+def test_fans_without_readings_are_left_alone():
+    assert controller().evaluate({"01-Inlet Ambient": 30}, {}) == {}
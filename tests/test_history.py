@@ -0,0 +1,46 @@
+from history import HistoryStore, RingFile
+
+def test_ring_wraps_around_and_keeps_the_newest_records(tmp_path):
+    ring = RingFile(tmp_path / "raw.ring", ["cpu", "fan"], capacity=8)
+    for t in range(20):
+        ring.append(float(t), {"cpu": 40 + t, "fan": 30})
+
+    # The slot the next append overwrites is never read
+    timestamps, series = ring.query(["cpu"], 0, 100)
+    assert timestamps.tolist() == [float(t) for t in range(13, 20)]
+    assert series["cpu"].tolist() == [40 + t for t in range(13, 20)]
+    assert list(series) == ["cpu"]
+
+    # A range across the end of the blocks is read in two slices
+    timestamps, series = ring.query(["cpu", "fan"], 14, 17)
+    assert timestamps.tolist() == [14.0, 15.0, 16.0, 17.0]
+    assert series["fan"].tolist() == [30] * 4
+
+def test_ring_thins_out_past_max_points(tmp_path):
+    ring = RingFile(tmp_path / "raw.ring", ["cpu"], capacity=100)
+    for t in range(50):
+        ring.append(float(t), {"cpu": t})
+    timestamps, _ = ring.query(["cpu"], 0, 49, max_points=10)
+    assert len(timestamps) == 10
+    assert timestamps[0] == 0.0
+
+def test_ring_survives_a_reopen(tmp_path):
+    ring = RingFile(tmp_path / "raw.ring", ["cpu"], capacity=8)
+    for t in range(10):
+        ring.append(float(t), {"cpu": t})
+    ring.close()
+
+    ring = RingFile(tmp_path / "raw.ring", ["cpu"], capacity=8)
+    ring.append(10.0, {})
+    timestamps, series = ring.query(["cpu"], 0, 100)
+    assert timestamps.tolist() == [float(t) for t in range(4, 11)]
+    assert series["cpu"][-1] != series["cpu"][-1] # Missing reading stored as NaN
+
+def test_store_downsamples_and_returns_nothing_once_closed(tmp_path):
+    store = HistoryStore(tmp_path, ["cpu"], [("raw", 0, 100), ("1m", 60, 100)])
+    for t in range(0, 180, 10):
+        store.append(float(t), {"cpu": t})
+    assert store.query(["cpu"], 0, 180, resolution="1m")["series"]["cpu"] == [25, 85]
+
+    store.close()
+    assert store.query(["cpu"], 0, 180) == {"resolution": None, "timestamps": [], "series": {"cpu": []}}
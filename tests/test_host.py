@@ -0,0 +1,151 @@
+import asyncio, copy, json
+import httpx
+import pytest
+import config
+from registry import HardwareRegistry
+from state import Snapshot
+from host import IloHost, derive_mode
+
+HARDWARE = {
+    "fans": [
+        {"id": 0, "name": "Fan 1"},
+        {"id": 1, "name": "Fan 2"},
+        {"id": 2, "name": "Fan 3"},
+    ],
+    "sensors": [{"id": 1, "name": "02-CPU 1", "safe-max": 85}],
+}
+
+class FakeSSHPool:
+    """ Records the fan commands instead of sending them, failing those of the fans in `failing`. """
+
+    def __init__(self):
+        self.commands = []
+        self.failing = set()
+
+    async def run(self, command: str) -> str:
+        if int(command.split()[2]) in self.failing:
+            raise ConnectionError("iLO unreachable")
+        self.commands.append(command)
+        return ""
+
+    async def close(self):
+        pass
+
+class FakeRedfish:
+    """ Answers the thermal endpoint with the given fan readings (%), or with an error status. """
+
+    def __init__(self, fans: dict, status_code: int = 200):
+        self.fans = fans
+        self.status_code = status_code
+
+    async def get(self, url: str, headers=None) -> httpx.Response:
+        return httpx.Response(self.status_code, json={
+            "Fans": [{"FanName": name, "CurrentReading": reading} for name, reading in self.fans.items()],
+            "Temperatures": [{"Name": "02-CPU 1", "ReadingCelsius": 45}],
+        })
+
+@pytest.fixture
+def hardware(tmp_path, monkeypatch):
+    path = tmp_path / "hardware.json"
+    path.write_text(json.dumps(HARDWARE))
+    registry = HardwareRegistry(path)
+    monkeypatch.setattr(config, "HARDWARE", registry)
+    return registry
+
+@pytest.fixture
+def host(hardware, tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CONTROL_STATE_DIR", tmp_path / "control")
+    monkeypatch.setattr(config, "TRACE_ENABLED", False)
+    host = IloHost("test", "ilo.invalid", "test", "test")
+    host.ssh_pool = FakeSSHPool()
+    return host
+
+def test_mode_change_actuates_every_fan(host):
+    assert asyncio.run(host.change_mode("silent")) == {0: True, 1: True, 2: True}
+    assert sorted(host.ssh_pool.commands) == [f"fan p {i} lock {config.SILENT_MODE_SPEED}" for i in range(3)]
+    assert host.state.snapshot.mode == "silent"
+    assert dict(host.state.snapshot.applied) == {f"Fan {i}": config.SILENT_MODE_SPEED for i in (1, 2, 3)}
+
+def test_partial_mode_change_reflects_the_fans_actually_applied(host):
+    async def scenario():
+        await host.change_mode("silent")
+        host.ssh_pool.failing.add(1)
+        return await host.change_mode("auto")
+
+    assert asyncio.run(scenario()) == {0: True, 1: False, 2: True}
+    # Fan 2 is still locked at the silent speed, so the fans are neither in auto nor in silent mode
+    assert dict(host.state.snapshot.applied) == {"Fan 1": None, "Fan 2": config.SILENT_MODE_SPEED, "Fan 3": None}
+    assert host.state.snapshot.mode == "manual"
+
+@pytest.mark.parametrize("applied, mode", [
+    ({}, "auto"),
+    ({"Fan 1": None, "Fan 2": None}, "auto"),
+    ({"Fan 1": config.SILENT_MODE_SPEED, "Fan 2": config.SILENT_MODE_SPEED}, "silent"),
+    ({"Fan 1": config.SILENT_MODE_SPEED, "Fan 2": None}, "manual"),
+    ({"Fan 1": 100, "Fan 2": 100, "Fan 3": 100}, "manual"),
+])
+def test_derive_mode(hardware, applied, mode):
+    assert derive_mode(Snapshot(applied=applied)) == mode
+
+MANUAL_READING = round(config.MANUAL_DEFAULT_SPEED / 255 * 100) # % read back from a fan locked at the default speed
+
+def test_reconcile_skips_the_fans_already_in_place(host):
+    host.state.update(mode="manual", applied={"Fan 1": config.MANUAL_DEFAULT_SPEED, "Fan 2": config.MANUAL_DEFAULT_SPEED})
+    host.http_client = FakeRedfish({"Fan 1": MANUAL_READING, "Fan 2": 40, "Fan 3": MANUAL_READING})
+    asyncio.run(host.reconcile())
+    # Fan 2 reads another speed and Fan 3 was not saved as locked
+    assert sorted(host.ssh_pool.commands) == [f"fan p {i} lock {config.MANUAL_DEFAULT_SPEED}" for i in (1, 2)]
+    assert host.state.snapshot.mode == "manual"
+
+def test_reconcile_always_sends_the_unlocks(host):
+    host.state.update(mode="auto", applied={"Fan 1": None, "Fan 2": None, "Fan 3": None})
+    host.http_client = FakeRedfish({"Fan 1": 20, "Fan 2": 20, "Fan 3": 20})
+    asyncio.run(host.reconcile())
+    assert sorted(host.ssh_pool.commands) == [f"fan p {i} unlock" for i in range(3)]
+
+def test_reconcile_without_readings_reapplies_every_fan(host):
+    host.state.update(mode="manual", applied={f"Fan {i}": config.MANUAL_DEFAULT_SPEED for i in (1, 2, 3)})
+    host.http_client = FakeRedfish({}, status_code=503)
+    asyncio.run(host.reconcile())
+    assert len(host.ssh_pool.commands) == 3
+
+def test_failed_reconciliation_derives_the_mode(host):
+    host.state.update(mode="silent")
+    host.http_client = FakeRedfish({"Fan 1": 20, "Fan 2": 20, "Fan 3": 20})
+    host.ssh_pool.failing.update({0, 1, 2})
+    asyncio.run(host.reconcile())
+    assert host.state.snapshot.mode == "auto"
+
+def test_restore_keeps_the_controller_settings_of_config(host):
+    host.control_file.path.parent.mkdir(parents=True)
+    host.control_file.path.write_text(json.dumps({
+        "mode": "curve",
+        "manual_speeds": {"Fan 1": 40, "Fan 9": 40},
+        "applied": {"Fan 1": 40},
+        "controller": {"hysteresis": 10, "deadband": 30}, # Saved by older versions
+    }))
+    host.restore_control_state()
+    assert host.state.snapshot.mode == "curve"
+    assert host.state.snapshot.manual_speeds["Fan 1"] == 40 and "Fan 9" not in host.state.snapshot.manual_speeds
+    assert host.curve_controller.hysteresis == config.CURVE_MODE_HYSTERESIS
+    assert host.curve_controller.deadband == config.CURVE_MODE_DEADBAND
+
+def test_reload_unlocks_the_locked_fans_it_drops(hardware, host):
+    async def scenario():
+        await host.change_mode("manual")
+        host.ssh_pool.commands.clear()
+
+        # Fan 2 is disabled and Fan 3 removed while locked
+        definition = copy.deepcopy(HARDWARE)
+        definition["fans"][1]["enabled"] = False
+        del definition["fans"][2]
+        hardware.path.write_text(json.dumps(definition))
+        hardware.listeners.append(host.hardware_changed)
+        assert hardware.reload()
+        await asyncio.gather(*host._tasks)
+
+    asyncio.run(scenario())
+    assert sorted(host.ssh_pool.commands) == ["fan p 1 unlock", "fan p 2 unlock"]
+    assert host.state.snapshot.applied["Fan 2"] is None
+    assert host.state.snapshot.applied["Fan 3"] is None
+    assert host.state.snapshot.mode == "manual"
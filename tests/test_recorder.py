@@ -0,0 +1,58 @@
+from datetime import datetime
+from recorder import TraceRecorder, read_trace
+
+NOON = datetime(2026, 1, 1, 12).timestamp()
+DAY = 24 * 3600
+
+def traces(directory) -> list:
+    return sorted(directory.glob("*.trace.gz"))
+
+def test_records_round_trip(tmp_path):
+    recorder = TraceRecorder(tmp_path)
+    recorder.tick(NOON) # Nothing to repeat before the first snapshot
+    recorder.snapshot(NOON, {"02-CPU 1": 45}, {"Fan 1": 20})
+    recorder.tick(NOON + 2)
+    recorder.mode(NOON + 3, "manual")
+    recorder.actuation(NOON + 3.5, 0, 40)
+    recorder.actuation(NOON + 4, 1, None)
+    recorder.snapshot(NOON + 5, {"02-CPU 1": 46, "03-CPU 2": 40}, {"Fan 1": 25})
+    recorder.close()
+
+    assert list(read_trace(traces(tmp_path))) == [
+        ("h", ["02-CPU 1"], ["Fan 1"]),
+        ("s", NOON, [45], [20]),
+        ("t", NOON + 2),
+        ("m", NOON + 3, "manual"),
+        ("a", NOON + 3.5, 0, 40),
+        ("a", NOON + 4, 1, None),
+        ("h", ["02-CPU 1", "03-CPU 2"], ["Fan 1"]),
+        ("s", NOON + 5, [46, 40], [25]),
+    ]
+
+def test_every_day_stands_on_its_own(tmp_path):
+    recorder = TraceRecorder(tmp_path)
+    recorder.snapshot(NOON, {"02-CPU 1": 45}, {"Fan 1": 20})
+    recorder.tick(NOON + DAY)
+    recorder.close()
+
+    first, second = traces(tmp_path)
+    assert list(read_trace([second])) == [("h", ["02-CPU 1"], ["Fan 1"]), ("s", NOON + DAY, [45], [20])]
+
+def test_files_past_the_retention_are_deleted(tmp_path):
+    recorder = TraceRecorder(tmp_path, retention_days=2)
+    for day in range(5):
+        recorder.snapshot(NOON + day * DAY, {"02-CPU 1": 45}, {"Fan 1": 20})
+    recorder.close()
+    assert [p.name[:10] for p in traces(tmp_path)] == ["2026-01-03", "2026-01-04", "2026-01-05"]
+
+def test_truncated_file_yields_the_records_before_the_damage(tmp_path):
+    recorder = TraceRecorder(tmp_path)
+    for i in range(200):
+        recorder.snapshot(NOON + i, {"02-CPU 1": 40 + i % 10}, {"Fan 1": 20})
+    recorder.close()
+    path, = traces(tmp_path)
+    path.write_bytes(path.read_bytes()[:-20])
+
+    records = list(read_trace([path]))
+    assert records[0] == ("h", ["02-CPU 1"], ["Fan 1"])
+    assert 1 < len(records) < 201
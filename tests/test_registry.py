@@ -0,0 +1,53 @@
+import copy, json
+from pathlib import Path
+import pytest
+from registry import Registry
+
+HARDWARE_FILE = Path(__file__).resolve().parent.parent / "src" / "hardware.json"
+
+DEFINITION = {
+    "fans": [
+        {"id": 0, "name": "Fan 1"},
+        {"id": 1, "name": "Fan 2", "enabled": False},
+    ],
+    "groups": [{"name": "memory", "verbose-name": "Memory"}],
+    "sensors": [
+        {"id": 1, "name": "02-CPU 1", "verbose-name": "CPU 1", "safe-max": 85},
+        {"id": 2, "name": "04-P1 DIMM 1-3", "safe-max": 87, "group": "memory"},
+        {"id": 3, "name": "05-P1 DIMM 4-6", "safe-max": 85, "group": "memory"},
+        {"id": 4, "name": "06-Disabled", "safe-max": 60, "enabled": False},
+    ],
+}
+
+def definition(**changes) -> dict:
+    data = copy.deepcopy(DEFINITION)
+    data.update(changes)
+    return data
+
+def test_shipped_hardware_file_loads():
+    registry = Registry.load(HARDWARE_FILE)
+    assert registry.enabled_fans
+    assert len(registry.threshold_names) == len(registry.threshold_values) == len(registry.enabled_sensors)
+    assert json.loads(HARDWARE_FILE.read_text())["fans"][0]["name"] in registry.fans_by_name
+
+def test_indexes_and_thresholds():
+    registry = Registry(definition())
+    assert [f.id for f in registry.enabled_fans] == [0]
+    assert registry.threshold_names == ("02-CPU 1", "04-P1 DIMM 1-3", "05-P1 DIMM 4-6")
+    assert list(registry.threshold_values) == [85, 87, 85]
+    assert registry.groups["memory"].safe_max == 85 # Lowest safe max of its members
+    assert registry.groups["memory"].value({"04-P1 DIMM 1-3": 40, "05-P1 DIMM 4-6": 45}) == 42.5
+
+@pytest.mark.parametrize("data", [
+    definition(fans=[{"id": 0, "name": "Fan 1"}, {"id": 0, "name": "Fan 2"}]),
+    definition(fans=[{"id": 0}]),
+    definition(groups=[{"name": "memory", "aggregate": "median"}]),
+    definition(groups=[{"name": "memory", "safe-max": "85"}]),
+    definition(groups=[]),
+    definition(sensors=[{"id": 1, "name": "02-CPU 1", "safe-max": True}]),
+    # Invalid member of a group without its own safe max, once a TypeError that stopped hot-reloading
+    definition(sensors=[{"id": 2, "name": "04-P1 DIMM 1-3", "safe-max": "87", "group": "memory"}]),
+])
+def test_invalid_definitions_raise_value_error(data):
+    with pytest.raises(ValueError):
+        Registry(data)
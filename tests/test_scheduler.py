@@ -0,0 +1,41 @@
+from registry import Registry
+from scheduler import PollScheduler
+
+REGISTRY = Registry({
+    "fans": [{"id": 0, "name": "Fan 1"}],
+    "sensors": [{"id": 1, "name": "02-CPU 1", "safe-max": 85}],
+})
+
+def make_scheduler() -> PollScheduler:
+    return PollScheduler(REGISTRY, base=2, fast=1, idle=15, backoff_max=60, hot_margin=10, fast_rate=0.2, rate_window=10)
+
+def test_whole_degree_flicker_keeps_the_default_interval():
+    # A stable sensor sitting on a rounding boundary: 50, 51, 50, 51...
+    scheduler = make_scheduler()
+    intervals = [scheduler.next_interval({"02-CPU 1": 50 + t % 2}, 2.0 * t, ok=True, can_idle=False) for t in range(100)]
+    assert set(intervals) == {2}
+
+def test_fast_change_polls_fast():
+    scheduler = make_scheduler()
+    intervals = [scheduler.next_interval({"02-CPU 1": round(40 + 0.5 * t)}, float(t), ok=True, can_idle=True) for t in range(30)]
+    assert intervals[-1] == 1
+
+def test_hot_sensor_polls_fast():
+    scheduler = make_scheduler()
+    assert scheduler.next_interval({"02-CPU 1": 76}, 0, ok=True, can_idle=True) == 1
+
+def test_stable_readings_idle_only_when_allowed():
+    scheduler = make_scheduler()
+    assert scheduler.next_interval({"02-CPU 1": 50}, 0, ok=True, can_idle=True) == 15
+    assert scheduler.next_interval({"02-CPU 1": 50}, 15, ok=True, can_idle=False) == 2
+
+def test_errors_back_off_up_to_the_limit():
+    scheduler = make_scheduler()
+    intervals = [scheduler.next_interval({}, 0, ok=False, can_idle=False) for _ in range(10)]
+    assert all(0 < interval <= 60 for interval in intervals)
+    assert intervals[-1] >= 30
+    assert scheduler.next_interval({"02-CPU 1": 50}, 0, ok=True, can_idle=False) == 2
+
+def test_errors_never_back_off_past_the_default_interval_while_locked():
+    scheduler = make_scheduler()
+    assert all(scheduler.next_interval({}, 0, ok=False, can_idle=False, locked=True) <= 2 for _ in range(10))
@@ -0,0 +1,46 @@
+import pytest
+from state import StateStore, memoized
+
+calls = []
+
+@memoized("fans")
+def fan_count(snapshot) -> int:
+    calls.append(snapshot.version)
+    return len(snapshot.fans)
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    calls.clear()
+
+def test_update_bumps_the_version_and_freezes_the_snapshot():
+    store = StateStore(fans={"Fan 1": 20})
+    snapshot = store.update(mode="manual")
+    assert snapshot.version == 1 and snapshot is store.snapshot
+    with pytest.raises(TypeError):
+        snapshot.fans["Fan 1"] = 30
+
+def test_unchanged_values_keep_the_snapshot():
+    store = StateStore(fans={"Fan 1": 20})
+    snapshot = store.snapshot
+    assert store.update(fans={"Fan 1": 20}, mode="auto") is snapshot
+
+def test_memoized_values_survive_unrelated_changes():
+    store = StateStore(fans={"Fan 1": 20})
+    assert fan_count(store.snapshot) == 1
+    store.update(temperatures={"02-CPU 1": 45}, mode="manual")
+    assert fan_count(store.snapshot) == 1
+    assert calls == [0]
+
+def test_memoized_values_are_recomputed_when_a_dependency_changes():
+    store = StateStore(fans={"Fan 1": 20})
+    fan_count(store.snapshot)
+    store.update(fans={"Fan 1": 20, "Fan 2": 30})
+    assert fan_count(store.snapshot) == 2
+    assert calls == [0, 1]
+
+def test_invalidate_drops_every_memoized_value():
+    store = StateStore(fans={"Fan 1": 20})
+    fan_count(store.snapshot)
+    store.invalidate()
+    fan_count(store.snapshot)
+    assert calls == [0, 1]
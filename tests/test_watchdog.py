@@ -0,0 +1,44 @@
+from registry import Registry
+from watchdog import ThermalWatchdog
+
+REGISTRY = Registry({
+    "fans": [{"id": 0, "name": "Fan 1"}],
+    "sensors": [
+        {"id": 1, "name": "02-CPU 1", "verbose-name": "CPU 1", "safe-max": 85},
+        {"id": 2, "name": "01-Inlet Ambient", "safe-max": 42},
+    ],
+})
+
+def test_reading_at_safe_max_is_flagged():
+    watchdog = ThermalWatchdog(REGISTRY)
+    flagged = watchdog.evaluate({"02-CPU 1": 85, "01-Inlet Ambient": 20}, 0)
+    assert flagged == [("CPU 1", 85, 85, "exceeds safe-max")]
+
+def test_fast_climb_is_flagged_before_safe_max():
+    watchdog = ThermalWatchdog(REGISTRY, rise_horizon=10, rise_debounce=2)
+    for t in range(100):
+        value = 50 + 1.5 * t
+        flagged = watchdog.evaluate({"02-CPU 1": value}, float(t))
+        if flagged:
+            break
+    assert flagged and flagged[0][3].startswith("rising")
+    assert value < 85
+
+def test_quantized_steady_climb_is_flagged_before_safe_max():
+    # Whole-degree readings of a 0.5 °C/s climb polled every second: 50, 50, 51, 51, 52...
+    watchdog = ThermalWatchdog(REGISTRY, rise_horizon=10, rise_debounce=2)
+    for t in range(100):
+        value = round(50 + 0.5 * t)
+        flagged = watchdog.evaluate({"02-CPU 1": value}, float(t))
+        if flagged:
+            break
+    assert flagged and flagged[0][3].startswith("rising")
+    assert value < 85
+
+def test_stable_readings_near_safe_max_are_not_flagged():
+    watchdog = ThermalWatchdog(REGISTRY, rise_horizon=10, rise_debounce=2)
+    assert not any(watchdog.evaluate({"02-CPU 1": 82, "01-Inlet Ambient": 25}, float(t)) for t in range(60))
+
+def test_slow_climb_far_from_safe_max_is_not_flagged():
+    watchdog = ThermalWatchdog(REGISTRY, rise_horizon=10, rise_debounce=2)
+    assert not any(watchdog.evaluate({"02-CPU 1": round(40 + 0.1 * t)}, float(t)) for t in range(200))
@@ -0,0 +1,183 @@
+""" Benchmark the dashboard against the local iLO simulator.
+
+Starts a simulated iLO and the dashboard in the same process, then measures:
+    - mode switch latency: change_mode() over the pooled SSH connections,
+    - poll latency: one full Redfish poll, from the request to the watchdog, history and push,
+    - watchdog reaction: from a sensor crossing its safe max on the iLO to every fan unlocked,
+    - dashboard throughput: partial requests served to N concurrent clients.
+
+Usage:
+    python tools/benchmark.py --clients 50 --latency 0.02 --json results.json
+"""
+import argparse, asyncio, json, os, random, shutil, socket, statistics, sys, tempfile, time
+from pathlib import Path
+import httpx
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def summarize(samples: list) -> dict:
+    """ Count, mean, p50, p95 and max of a list of durations in seconds, reported in milliseconds. """
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    percentile = lambda q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] * 1000
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 2),
+        "p50_ms": round(percentile(0.50), 2),
+        "p95_ms": round(percentile(0.95), 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+async def bench_mode_switch(host, simulator, iterations: int) -> dict:
+    modes = ["manual", "silent", "auto"]
+    commands = simulator.counters["ssh_commands"]
+    samples = []
+    for i in range(iterations):
+        started = time.perf_counter()
+        await host.change_mode(modes[i % len(modes)])
+        samples.append(time.perf_counter() - started)
+    await host.change_mode("auto")
+    return {**summarize(samples), "ssh_commands": simulator.counters["ssh_commands"] - commands}
+
+async def bench_poll(host, iterations: int) -> dict:
+    samples, failures = [], 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        if not await host.poll_once():
+            failures += 1
+        samples.append(time.perf_counter() - started)
+    return {**summarize(samples), "failures": failures}
+
+async def bench_watchdog(host, simulator, iterations: int, timeout: float = 30) -> dict:
+    import config
+    from prometheus_client import REGISTRY
+
+    sensor = config.HARDWARE.current.enabled_sensors[0]
+    name, safe_max = sensor.name, sensor.safe_max
+    labels = {"host": host.name}
+    samples, timeouts = [], 0
+    internal_sum = REGISTRY.get_sample_value("ilo_watchdog_reaction_seconds_sum", labels) or 0
+    internal_count = REGISTRY.get_sample_value("ilo_watchdog_reaction_seconds_count", labels) or 0
+
+    for _ in range(iterations):
+        await host.change_mode("manual")
+
+        # Inject at a random point of the poll cycle, the reaction includes the wait for the next poll
+        await asyncio.sleep(random.uniform(0.1, host.state.snapshot.poll_interval or 1))
+
+        # Push one sensor over its safe max and wait for every fan to be handed back to the iLO
+        started = time.perf_counter()
+        simulator.model.overrides[name] = safe_max + 1
+        while any(pwm is not None for pwm in simulator.model.locked.values()):
+            if time.perf_counter() - started > timeout:
+                timeouts += 1
+                break
+            await asyncio.sleep(0.005)
+        else:
+            samples.append(time.perf_counter() - started)
+
+        simulator.model.overrides.pop(name)
+        while host.failsafe_active:
+            await asyncio.sleep(0.005)
+
+    internal_sum = (REGISTRY.get_sample_value("ilo_watchdog_reaction_seconds_sum", labels) or 0) - internal_sum
+    internal_count = (REGISTRY.get_sample_value("ilo_watchdog_reaction_seconds_count", labels) or 0) - internal_count
+    return {
+        **summarize(samples),
+        "timeouts": timeouts,
+        "detection_to_auto_mean_ms": round(internal_sum / internal_count * 1000, 2) if internal_count else None,
+    }
+
+async def bench_dashboard(app, host, clients: int, duration: float) -> dict:
+    paths = [f"{host.base}/temps", f"{host.base}/fans", f"{host.base}/mode-panel"]
+    samples, errors = [], 0
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        nonlocal errors
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://bench") as http:
+            i = 0
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await http.get(paths[i % len(paths)])
+                samples.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    errors += 1
+                i += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {**summarize(samples), "clients": clients, "errors": errors, "requests_per_second": round(len(samples) / elapsed, 1)}
+
+async def run(args) -> dict:
+    # The dashboard reads its configuration at import, so point it at the simulator first
+    http_port, ssh_port = _free_port(), _free_port()
+    os.environ["ILO_HOSTS"] = json.dumps([{
+        "name": "sim", "host": "127.0.0.1", "user": "sim", "password": "sim",
+        "ssh_port": ssh_port, "redfish_url": f"http://127.0.0.1:{http_port}",
+    }])
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+    # History, traces and control state go to a scratch directory removed afterwards, unless DATA_DIR is set
+    scratch = None
+    if "DATA_DIR" not in os.environ:
+        scratch = os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="ilo-bench-")
+    try:
+        return await run_benchmarks(args, http_port, ssh_port)
+    finally:
+        if scratch is not None:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+async def run_benchmarks(args, http_port: int, ssh_port: int) -> dict:
+    from ilo_simulator import SimulatedIlo, ThermalModel # Also puts src/ on the path
+    import config, main
+
+    model = ThermalModel(config.HARDWARE.current, load=args.load)
+    simulator = SimulatedIlo(model, args.latency, args.jitter, args.http_failure_rate, args.ssh_failure_rate, args.seed)
+    await simulator.start("127.0.0.1", http_port, ssh_port)
+
+    results = {}
+    try:
+        async with main.lifespan(main.app):
+            host = main.fleet.default
+            # Let the startup reconciliation finish before measuring
+            while len(host.state.snapshot.applied) < len(config.HARDWARE.current.enabled_fans):
+                await asyncio.sleep(0.01)
+
+            results["mode_switch"] = await bench_mode_switch(host, simulator, args.iterations)
+            results["poll"] = await bench_poll(host, args.iterations)
+            results["watchdog"] = await bench_watchdog(host, simulator, args.watchdog_iterations)
+            results["dashboard"] = await bench_dashboard(main.app, host, args.clients, args.duration)
+    finally:
+        await simulator.stop()
+    results["simulator"] = dict(simulator.counters)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard against a simulated iLO.")
+    parser.add_argument("--iterations", type=int, default=30, help="mode switches and polls to time")
+    parser.add_argument("--watchdog-iterations", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=20, help="concurrent dashboard clients")
+    parser.add_argument("--duration", type=float, default=5, help="seconds of dashboard load")
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated iLO latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--http-failure-rate", type=float, default=0.0)
+    parser.add_argument("--ssh-failure-rate", type=float, default=0.0)
+    parser.add_argument("--load", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=Path, default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    for name, values in results.items():
+        print(f"{name:12} " + "  ".join(f"{k}={v}" for k, v in values.items()))
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+""" Local iLO 4 simulator, to develop and benchmark the dashboard without a Gen8.
+
+Serves the Redfish thermal endpoint over HTTP and accepts the unlocked iLO
+`fan p N lock PWM` / `fan p N unlock` commands over SSH. A small thermal model
+heats the sensors with a configurable load and cools them with the fan speed,
+so locking the fans low eventually trips the watchdog, and unlocking them lets
+the simulated iLO PID bring the temperatures back down.
+
+Usage:
+    python tools/ilo_simulator.py --http-port 8080 --ssh-port 2222 --latency 0.05
+
+Then point the dashboard at it:
+    ILO_HOSTS='[{"name": "sim", "host": "127.0.0.1", "user": "sim", "password": "sim",
+                 "ssh_port": 2222, "redfish_url": "http://127.0.0.1:8080"}]' uvicorn main:app
+"""
+import argparse, asyncio, hashlib, json, logging, os, random, re, sys, time
+from pathlib import Path
+import asyncssh, uvicorn
+from fastapi import FastAPI, Request, Response
+
+# The hardware definition of the dashboard describes the simulated server
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+for name in ("ILO_HOST", "ILO_USER", "ILO_PASS"):
+    os.environ.setdefault(name, "sim")
+import config
+
+_FAN_COMMAND = re.compile(r"^fan p (\d+) (?:lock (\d+)|unlock)$")
+
+class ThermalModel:
+    """ First-order thermal model of the server.
+
+    Every sensor relaxes towards an equilibrium temperature set by the ambient temperature,
+    the load and the airflow of the fans. Fans run at their locked PWM, or at the speed picked
+    by a simple proportional controller standing in for the iLO PIDs when unlocked.
+
+    Args:
+        registry (Registry): Hardware definition of the simulated server, every sensor and fan is simulated.
+        ambient (float): Inlet temperature in °C.
+        load (float): Server load, 0 idle to 1 full load.
+        time_constant (float): Seconds for a sensor to cover 63% of the way to its equilibrium.
+        fan_slew (float): Maximum change of a fan speed in % per second.
+    """
+
+    def __init__(self, registry, ambient: float = 22, load: float = 0.3,
+                 time_constant: float = 30, fan_slew: float = 20):
+        self.sensors = [(s.name, s.safe_max) for s in registry.sensors]
+        self.inlet = {s.name for s in registry.sensors if "Inlet" in s.name} # Follows the ambient temperature
+        self.fan_ids = {f.id: f.name for f in registry.fans}
+        self.ambient = ambient
+        self.load = load
+        self.time_constant = time_constant
+        self.fan_slew = fan_slew
+
+        self.locked: dict[int, int | None] = {fan_id: None for fan_id in self.fan_ids}
+        self.speeds = {fan_id: 20.0 for fan_id in self.fan_ids}
+        self.temperatures = {name: ambient + 0.2 * (safe_max - ambient) for name, safe_max in self.sensors}
+        self.overrides: dict[str, float] = {}
+        self._last = time.monotonic()
+
+    def _equilibrium(self, name: str, safe_max: float, airflow: float) -> float:
+        """ Temperature a sensor settles at for the current load and an airflow between 0 and 1. """
+        if name in self.inlet:
+            return self.ambient
+        heat = 0.45 * (safe_max - self.ambient)
+        return self.ambient + heat * (0.2 + self.load) * 1.3 / (0.3 + airflow)
+
+    def _auto_speed(self) -> float:
+        """ Fan speed picked by the simulated iLO, faster as the hottest sensor gets closer to its safe max. """
+        margin = min(safe_max - self.temperatures[name] for name, safe_max in self.sensors)
+        return min(max(100 * (1 - margin / 40), 15), 100)
+
+    def step(self, now: float | None = None):
+        """ Advance the model to `now`, in steps of at most one second. """
+        now = time.monotonic() if now is None else now
+        elapsed, self._last = max(now - self._last, 0), now
+        while elapsed > 0:
+            dt = min(elapsed, 1.0)
+            elapsed -= dt
+
+            auto = self._auto_speed()
+            for fan_id, pwm in self.locked.items():
+                target = auto if pwm is None else pwm / 255 * 100
+                delta = max(min(target - self.speeds[fan_id], self.fan_slew * dt), -self.fan_slew * dt)
+                self.speeds[fan_id] += delta
+
+            airflow = sum(self.speeds.values()) / len(self.speeds) / 100
+            for name, safe_max in self.sensors:
+                target = self._equilibrium(name, safe_max, airflow)
+                self.temperatures[name] += (target - self.temperatures[name]) * min(dt / self.time_constant, 1)
+
+    def thermal(self) -> dict:
+        """ The Redfish Thermal document, with integer readings like a real iLO. """
+        self.step()
+        return {
+            "@odata.type": "#Thermal.1.1.0.Thermal",
+            "Fans": [
+                {"FanName": self.fan_ids[fan_id], "CurrentReading": round(speed), "Units": "Percent"}
+                for fan_id, speed in self.speeds.items()
+            ],
+            "Temperatures": [
+                {"Name": name, "ReadingCelsius": round(self.overrides.get(name, self.temperatures[name])), "UpperThresholdCritical": safe_max}
+                for name, safe_max in self.sensors
+            ],
+        }
+
+class SimulatedIlo:
+    """ Redfish and SSH front ends of a simulated iLO.
+
+    Args:
+        model (ThermalModel): The thermal model behind both front ends.
+        latency (float): Mean added latency of every request and command, in seconds.
+        jitter (float): Maximum random deviation added to the latency, in seconds.
+        http_failure_rate (float): Probability of a Redfish request answering 500.
+        ssh_failure_rate (float): Probability of a fan command exiting with an error.
+        seed (int | None): Seed of the random generator, for reproducible runs.
+    """
+
+    def __init__(self, model: ThermalModel, latency: float = 0.0, jitter: float = 0.0,
+                 http_failure_rate: float = 0.0, ssh_failure_rate: float = 0.0, seed: int | None = None):
+        self.model = model
+        self.latency = latency
+        self.jitter = jitter
+        self.http_failure_rate = http_failure_rate
+        self.ssh_failure_rate = ssh_failure_rate
+        self.random = random.Random(seed)
+        self.counters = {"http_requests": 0, "http_failures": 0, "ssh_connections": 0, "ssh_commands": 0, "ssh_failures": 0}
+        self.app = self._create_app()
+        self._http: uvicorn.Server | None = None
+        self._http_task: asyncio.Task | None = None
+        self._ssh: asyncssh.SSHAcceptor | None = None
+
+    async def _delay(self):
+        delay = self.latency + self.random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _create_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/redfish/v1/chassis/1/Thermal/")
+        async def thermal(request: Request):
+            self.counters["http_requests"] += 1
+            await self._delay()
+            if self.random.random() < self.http_failure_rate:
+                self.counters["http_failures"] += 1
+                return Response("Simulated iLO failure", status_code=500)
+
+            body = json.dumps(self.model.thermal()).encode()
+            etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+            if request.headers.get("If-None-Match") == etag:
+                return Response(status_code=304, headers={"ETag": etag})
+            return Response(body, media_type="application/json", headers={"ETag": etag})
+
+        # Controls of the simulation itself
+        @app.get("/sim/state")
+        async def sim_state():
+            self.model.step()
+            return {"load": self.model.load, "locked": self.model.locked, "speeds": self.model.speeds,
+                    "temperatures": self.model.temperatures, "overrides": self.model.overrides, "counters": self.counters}
+
+        @app.post("/sim/load")
+        async def sim_load(load: float):
+            self.model.step()
+            self.model.load = load
+            return {"load": load}
+
+        @app.post("/sim/override")
+        async def sim_override(name: str, value: float | None = None):
+            if value is None:
+                self.model.overrides.pop(name, None)
+            else:
+                self.model.overrides[name] = value
+            return self.model.overrides
+
+        return app
+
+    async def handle_command(self, process: asyncssh.SSHServerProcess):
+        """ Run a fan command received over SSH against the thermal model. """
+        self.counters["ssh_commands"] += 1
+        await self._delay()
+
+        match = _FAN_COMMAND.match((process.command or "").strip())
+        if not match or int(match.group(1)) not in self.model.locked:
+            process.stderr.write(f"Unknown command: {process.command}\n")
+            return process.exit(1)
+        if self.random.random() < self.ssh_failure_rate:
+            self.counters["ssh_failures"] += 1
+            process.stderr.write("Simulated iLO failure\n")
+            return process.exit(1)
+
+        fan_id, pwm = int(match.group(1)), match.group(2)
+        self.model.step()
+        self.model.locked[fan_id] = None if pwm is None else min(int(pwm), 255)
+        process.stdout.write("\n")
+        process.exit(0)
+
+    async def start(self, host: str = "127.0.0.1", http_port: int = 8080, ssh_port: int = 2222):
+        """ Start serving Redfish and SSH on the given ports. """
+        simulator = self
+
+        class _Server(asyncssh.SSHServer):
+            def connection_made(self, conn):
+                simulator.counters["ssh_connections"] += 1
+
+            def begin_auth(self, username):
+                return True
+
+            def password_auth_supported(self):
+                return True
+
+            def validate_password(self, username, password):
+                return True
+
+        # Same legacy algorithms as an iLO 4, so the dashboard connects with its usual options
+        self._ssh = await asyncssh.create_server(
+            _Server, host, ssh_port,
+            server_host_keys=[asyncssh.generate_private_key("ssh-rsa")],
+            kex_algs=["diffie-hellman-group1-sha1"],
+            process_factory=self.handle_command,
+        )
+
+        self._http = uvicorn.Server(uvicorn.Config(self.app, host=host, port=http_port, log_level="warning", lifespan="off"))
+        self._http_task = asyncio.create_task(self._http.serve())
+        while not self._http.started:
+            await asyncio.sleep(0.01)
+
+    async def stop(self):
+        if self._http is not None:
+            self._http.should_exit = True
+            await self._http_task
+        if self._ssh is not None:
+            self._ssh.close()
+            await self._ssh.wait_closed()
+
+async def main():
+    parser = argparse.ArgumentParser(description="Simulated iLO 4 with a Redfish thermal endpoint and SSH fan commands.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--http-port", type=int, default=8080)
+    parser.add_argument("--ssh-port", type=int, default=2222)
+    parser.add_argument("--latency", type=float, default=0.0, help="mean added latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="maximum latency deviation in seconds")
+    parser.add_argument("--http-failure-rate", type=float, default=0.0)
+    parser.add_argument("--ssh-failure-rate", type=float, default=0.0)
+    parser.add_argument("--ambient", type=float, default=22, help="inlet temperature in °C")
+    parser.add_argument("--load", type=float, default=0.3, help="server load, 0 to 1")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    model = ThermalModel(config.HARDWARE.current, ambient=args.ambient, load=args.load)
+    simulator = SimulatedIlo(model, args.latency, args.jitter, args.http_failure_rate, args.ssh_failure_rate, args.seed)
+    await simulator.start(args.host, args.http_port, args.ssh_port)
+    logging.info(f"Simulated iLO serving Redfish on http://{args.host}:{args.http_port} and SSH on port {args.ssh_port}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    asyncio.run(main())
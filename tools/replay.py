@@ -0,0 +1,316 @@
+""" Replay recorded traces against candidate fan policies, much faster than real time.
+
+Reads the traces written by the dashboard (DATA_DIR/traces/<host>/*.trace.gz) as a stream,
+and runs every policy side by side in a single pass: the same thermal watchdog as the
+dashboard, and the fan commands each policy would have sent. Reports for each policy the
+time any sensor spent over its safe max, the fan effort integral and the SSH command count.
+
+Policies:
+    recorded        what actually happened, as recorded
+    auto            fans always unlocked, the iLO in control
+    silent[=PWM]    every fan locked at PWM, SILENT_MODE_SPEED by default
+    manual[=PWM]    every fan locked at PWM, MANUAL_DEFAULT_SPEED by default
+    curve           the closed-loop fan curves of the configuration
+
+The recorded temperatures were produced by the recorded fan speeds. For other policies
+they are corrected by a first-order model: every sensor moves by `sensitivity` °C per
+% of fan speed below the recorded one, reached with the given time constant. Policies
+that lock the fans are handed back to the iLO when the watchdog fires, like the dashboard.
+
+Usage:
+    python tools/replay.py src/data/traces/default --policy recorded --policy silent=20 --policy curve
+"""
+import argparse, itertools, json, os, sys, time
+from pathlib import Path
+
+# The hardware definition and watchdog of the dashboard are the ones replayed
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+for name in ("ILO_HOST", "ILO_USER", "ILO_PASS"):
+    os.environ.setdefault(name, "replay")
+import config
+from controller import CurveController
+from recorder import read_trace
+from registry import Registry
+from watchdog import ThermalWatchdog
+
+BATCH_SIZE = 4096 # Samples evaluated by every policy before reading the next batch
+
+class Sample:
+    """ One recorded snapshot, with what every policy needs precomputed once. """
+    __slots__ = ("t", "dt", "values", "fan_speed", "margin", "actuations", "mode")
+
+    def __init__(self, t, dt, values, fan_speed, margin, actuations, mode):
+        self.t = t
+        self.dt = dt                  # Seconds covered by this sample, 0 after a gap
+        self.values = values          # Readings of the needed sensors, in Replay.needed order
+        self.fan_speed = fan_speed    # Mean recorded fan speed in %
+        self.margin = margin          # Smallest distance of an enabled sensor to its safe max, in °C
+        self.actuations = actuations  # Fan commands recorded since the previous sample
+        self.mode = mode              # Recorded fan mode
+
+class PolicyRun:
+    """ State and metrics of one candidate policy during a replay.
+
+    Args:
+        name (str): Label of the policy, e.g. "silent=20".
+        kind (str): One of "recorded", "auto", "silent", "manual", or "curve".
+        pwm (int | None): PWM of the fixed speed policies.
+        replay (Replay): The replay this policy runs in.
+    """
+
+    def __init__(self, name: str, kind: str, pwm: int | None, replay: "Replay"):
+        self.name = name
+        self.kind = kind
+        self.pwm = pwm
+        self.replay = replay
+        self.watchdog = ThermalWatchdog(replay.registry, replay.horizon, replay.debounce)
+        self.controller = CurveController(
+            config.CURVE_MODE_CURVES,
+            config.CURVE_MODE_FAN_SENSORS,
+            hysteresis=config.CURVE_MODE_HYSTERESIS,
+            max_step_up=config.CURVE_MODE_MAX_STEP_UP,
+            max_step_down=config.CURVE_MODE_MAX_STEP_DOWN,
+            deadband=config.CURVE_MODE_DEADBAND,
+        ) if kind == "curve" else None
+
+        self.locked = kind in {"silent", "manual", "curve"} # Whether the policy currently holds the fans
+        self.applied: dict[int, int | None] = {}
+        self.offset = 0.0 # Current temperature correction in °C
+        self.failsafe_since = None
+
+        self.duration = 0.0
+        self.over_threshold = 0.0
+        self.max_overshoot = 0.0
+        self.effort = 0.0
+        self.ssh_commands = 0
+        self.watchdog_triggers = 0
+        self.failsafe_time = 0.0
+
+    def _apply(self, targets: dict):
+        """ Count the commands needed to reach the targets, skipping fans already there. """
+        for fan_id, pwm in targets.items():
+            if fan_id not in self.applied or self.applied[fan_id] != pwm:
+                self.applied[fan_id] = pwm
+                self.ssh_commands += 1
+
+    def _fan_speed(self, sample: Sample) -> float:
+        """ Mean fan speed in % under this policy, the recorded one while the iLO is in control. """
+        if not self.locked or not self.applied:
+            return sample.fan_speed
+        return sum(pwm / 255 * 100 for pwm in self.applied.values()) / len(self.applied)
+
+    def run(self, batch: list):
+        """ Evaluate the policy over a batch of samples. """
+        replay = self.replay
+        needed = replay.needed
+        sensitivity, time_constant = replay.sensitivity, replay.time_constant
+        fan_ids = replay.fan_ids
+
+        for sample in batch:
+            dt = sample.dt
+            if self.kind == "recorded":
+                self.ssh_commands += sample.actuations
+                self.locked = sample.mode != "auto"
+            speed = self._fan_speed(sample)
+
+            # Metrics of the interval ending at this sample
+            if dt:
+                self.duration += dt
+                self.effort += speed * dt
+                if self.offset >= sample.margin:
+                    self.over_threshold += dt
+                    self.max_overshoot = max(self.max_overshoot, self.offset - sample.margin)
+                if self.failsafe_since is not None:
+                    self.failsafe_time += dt
+
+            if self.kind == "recorded":
+                continue
+
+            # Slower fans than recorded means hotter sensors, after the thermal lag
+            step = min(dt / time_constant, 1) if time_constant else 1
+            self.offset += (sensitivity * (sample.fan_speed - speed) - self.offset) * step
+            if self.kind == "auto":
+                self._apply({fan_id: None for fan_id in fan_ids})
+                continue
+            offset = self.offset
+            temperatures = {name: value + offset for name, value in zip(needed, sample.values) if value is not None}
+
+            # The dashboard watchdog hands the fans back to the iLO when a sensor is flagged
+            if self.locked and self.watchdog.evaluate(temperatures, sample.t):
+                self.watchdog_triggers += 1
+                self._apply({fan_id: None for fan_id in fan_ids})
+                self.locked = False
+                self.failsafe_since = sample.t
+                continue
+
+            if not self.locked:
+                if replay.rearm is None or sample.t - self.failsafe_since < replay.rearm:
+                    continue
+                # Back to the policy, as a user re-enabling it after the failsafe
+                self.locked = True
+                self.failsafe_since = None
+                if self.controller is not None:
+                    self.controller.reset()
+
+            if self.controller is not None:
+                current = {fan_id: pwm for fan_id, pwm in self.applied.items() if pwm is not None}
+                targets = self.controller.evaluate(temperatures, current)
+                self._apply({fan_id: pwm for fan_id, pwm in targets.items() if fan_id in fan_ids})
+            else:
+                self._apply({fan_id: self.pwm for fan_id in fan_ids})
+
+    def report(self) -> dict:
+        hours = self.duration / 3600
+        return {
+            "policy": self.name,
+            "hours": round(hours, 2),
+            "over_threshold_s": round(self.over_threshold, 1),
+            "over_threshold_pct": round(100 * self.over_threshold / self.duration, 3) if self.duration else 0,
+            "max_overshoot_c": round(self.max_overshoot, 1),
+            "mean_fan_pct": round(self.effort / self.duration, 1) if self.duration else None,
+            "fan_effort_pct_h": round(self.effort / 3600, 1),
+            "ssh_commands": self.ssh_commands,
+            "watchdog_triggers": self.watchdog_triggers,
+            "failsafe_s": round(self.failsafe_time, 1),
+        }
+
+class Replay:
+    """ Streaming replay of trace records through several policies at once.
+
+    Records are turned into samples once, with the shared quantities (mean recorded fan
+    speed, smallest margin to the thresholds) computed from the registry threshold arrays,
+    then every policy evaluates each batch of samples in turn.
+
+    Args:
+        registry (Registry): Hardware definition, for the enabled sensors and thresholds.
+        policies (list): Policy specifications, e.g. ["recorded", "silent=20", "curve"].
+        horizon (float): Watchdog rise horizon in seconds.
+        debounce (int): Watchdog rise debounce in evaluations.
+        sensitivity (float): °C per % of fan speed below the recorded one.
+        time_constant (float): Seconds for the temperature correction to settle.
+        rearm (float | None): Seconds after a watchdog trigger before a policy takes the fans back, never if None.
+        max_gap (float): Longest gap between samples still counted as recorded time, in seconds.
+    """
+
+    def __init__(self, registry: Registry, policies: list, horizon: float, debounce: int, sensitivity: float,
+                 time_constant: float, rearm: float | None, max_gap: float):
+        self.registry = registry
+        self.horizon = horizon
+        self.debounce = debounce
+        self.sensitivity = sensitivity
+        self.time_constant = time_constant
+        self.rearm = rearm
+        self.max_gap = max_gap
+        self.fan_ids = [fan.id for fan in registry.enabled_fans]
+
+        # Sensors read by the watchdog or the curves, the only ones kept per sample
+        self.needed = list(registry.threshold_names) + [n for n in config.CURVE_MODE_CURVES if n not in registry.threshold_names]
+        safe_max = dict(zip(registry.threshold_names, registry.threshold_values))
+        self._thresholds = [(i, safe_max[name]) for i, name in enumerate(self.needed) if name in safe_max]
+
+        self.runs = [self._parse(spec) for spec in policies]
+        self.samples = 0
+        self.first = None
+        self.last = None
+
+    def _parse(self, spec: str) -> PolicyRun:
+        kind, _, value = spec.partition("=")
+        if kind not in {"recorded", "auto", "silent", "manual", "curve"}:
+            raise ValueError(f"Unknown policy: {spec}")
+        pwm = None
+        if kind == "silent":
+            pwm = int(value) if value else config.SILENT_MODE_SPEED
+        elif kind == "manual":
+            pwm = int(value) if value else config.MANUAL_DEFAULT_SPEED
+        if pwm is not None and not 0 <= pwm <= 255:
+            raise ValueError(f"Invalid PWM in policy {spec}, must be between 0 and 255")
+        return PolicyRun(spec if value or pwm is None else f"{kind}={pwm}", kind, pwm, self)
+
+    def _samples(self, records):
+        """ Turn trace records into samples, keeping only the needed sensors. """
+        index = None
+        previous = None
+        readings = None # Needed values, mean fan speed and margin of the last snapshot, repeated by ticks
+        actuations, mode = 0, "auto"
+        for record in records:
+            kind = record[0]
+            if kind == "h":
+                columns = {name: i for i, name in enumerate(record[1])}
+                index = [columns.get(name) for name in self.needed]
+                continue
+            if kind == "a":
+                actuations += 1
+                continue
+            if kind == "m":
+                mode = record[2]
+                continue
+            if kind == "s" and index is not None:
+                _, t, temperatures, fans = record
+                values = [temperatures[i] if i is not None else None for i in index]
+                margin = min((safe_max - values[i] for i, safe_max in self._thresholds if values[i] is not None), default=float("inf"))
+                speeds = [f for f in fans if f is not None]
+                readings = (values, sum(speeds) / len(speeds) if speeds else 0.0, margin)
+            elif kind == "t" and readings is not None:
+                t = record[1]
+            else:
+                continue
+            dt = t - previous if previous is not None and 0 < t - previous <= self.max_gap else 0.0
+            previous = t
+            yield Sample(t, dt, *readings, actuations, mode)
+            actuations = 0
+
+    def run(self, records):
+        """ Replay a stream of trace records through every policy. """
+        samples = self._samples(records)
+        while batch := list(itertools.islice(samples, BATCH_SIZE)):
+            if self.first is None:
+                self.first = batch[0].t
+            self.last = batch[-1].t
+            self.samples += len(batch)
+            for run in self.runs:
+                run.run(batch)
+
+    def report(self) -> list:
+        return [run.report() for run in self.runs]
+
+def trace_files(paths: list) -> list:
+    """ Trace files of the given files and folders, in chronological order. """
+    files = []
+    for path in map(Path, paths):
+        files += sorted(path.glob("*.trace.gz")) if path.is_dir() else [path]
+    return files
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded traces against candidate fan policies.")
+    parser.add_argument("traces", nargs="+", help="trace files or folders of trace files")
+    parser.add_argument("--policy", action="append", dest="policies",
+                        help="recorded, auto, silent[=PWM], manual[=PWM] or curve, repeat to compare (default: all)")
+    parser.add_argument("--hardware", type=Path, default=None, help="hardware definition, the configured one by default")
+    parser.add_argument("--horizon", type=float, default=config.WATCHDOG_RISE_HORIZON, help="watchdog rise horizon in seconds")
+    parser.add_argument("--debounce", type=int, default=config.WATCHDOG_RISE_DEBOUNCE, help="watchdog rise debounce in polls")
+    parser.add_argument("--sensitivity", type=float, default=0.3, help="°C per %% of fan speed below the recorded one")
+    parser.add_argument("--time-constant", type=float, default=60, help="seconds for temperatures to follow a fan change")
+    parser.add_argument("--rearm", type=float, default=None, help="seconds after a watchdog trigger before a policy resumes")
+    parser.add_argument("--max-gap", type=float, default=300, help="longest gap between polls counted as recorded time, e.g. downtime")
+    parser.add_argument("--json", type=Path, default=None, help="also write the results to this file")
+    args = parser.parse_args()
+
+    registry = Registry.load(args.hardware) if args.hardware else config.HARDWARE.current
+    policies = args.policies or ["recorded", "auto", "silent", "manual", "curve"]
+    replay = Replay(registry, policies, args.horizon, args.debounce, args.sensitivity, args.time_constant, args.rearm, args.max_gap)
+
+    started = time.perf_counter()
+    replay.run(read_trace(trace_files(args.traces)))
+    elapsed = time.perf_counter() - started
+
+    results = replay.report()
+    covered = (replay.last - replay.first) if replay.samples else 0
+    print(f"Replayed {replay.samples} samples covering {covered / 3600:.1f}h in {elapsed:.2f}s "
+          f"({covered / elapsed if elapsed else 0:.0f}x real time) through {len(results)} policies")
+    for result in results:
+        print("  ".join(f"{k}={v}" for k, v in result.items()))
+    if args.json is not None:
+        args.json.write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()